@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Create an admin user, or promote an existing user to admin
+"""
+import argparse
+import getpass
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from database import engine
+from models import User, UserRole
+from auth import get_password_hash
+
+def provision_admin(
+    db_engine: Engine, email: str, password: Optional[str] = None, full_name: str = "Administrator"
+) -> str:
+    """Make the user with this email an admin, creating it if needed
+    
+    An existing user keeps its password unless a new one is given. Returns
+    "created", "promoted" or "unchanged".
+    """
+    with Session(db_engine) as db:
+        user = db.scalar(select(User).where(User.email == email))
+        if user is None:
+            if not password:
+                raise ValueError(f"A password is required to create admin '{email}'")
+            db.add(User(
+                email=email,
+                hashed_password=get_password_hash(password),
+                full_name=full_name,
+                role=UserRole.ADMIN
+            ))
+            outcome = "created"
+        else:
+            outcome = "unchanged" if user.role == UserRole.ADMIN else "promoted"
+            user.role = UserRole.ADMIN
+            if password:
+                user.hashed_password = get_password_hash(password)
+        db.commit()
+    return outcome
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("email")
+    parser.add_argument("--full-name", default="Administrator")
+    parser.add_argument(
+        "--password", action="store_true",
+        help="Prompt for a password (required when the user does not exist yet)"
+    )
+    args = parser.parse_args()
+    
+    password = getpass.getpass("Password: ") if args.password else None
+    try:
+        outcome = provision_admin(engine, args.email, password, args.full_name)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Admin {args.email} {outcome}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,17 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
+import threading
+import time
+import uuid
+
+from config import settings
+from models import UserRole
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
@@ -18,6 +27,40 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+class PasswordHasherBusy(Exception):
+    """Raised when too much password work is already queued"""
+    
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+# bcrypt releases the GIL, so a small thread pool keeps the event loop free
+# while hashes run. Work beyond the workers plus the queue limit is shed
+# instead of piling up behind a login storm.
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers, thread_name_prefix="password-hash"
+)
+_password_slots = threading.BoundedSemaphore(
+    settings.password_hash_workers + settings.password_hash_max_queue
+)
+
+async def _run_password_work(fn, *args):
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordHasherBusy(settings.password_hash_retry_after)
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, fn, *args)
+    finally:
+        _password_slots.release()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password executor"""
+    return await _run_password_work(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the password executor"""
+    return await _run_password_work(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -30,6 +73,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_user_token(user) -> str:
+    """Create an access token carrying the claims request handling needs"""
+    return create_access_token(data={"sub": str(user.id), "role": user.role.value})
+
 def verify_token(token: str):
     """Verify and decode a JWT token"""
     try:
@@ -37,3 +84,95 @@ def verify_token(token: str):
         return payload
     except JWTError:
         return None
+
+class Principal:
+    """Identity of an authenticated caller, built from token claims"""
+    
+    __slots__ = ("id", "role", "expires_at")
+    
+    def __init__(self, id: uuid.UUID, role: Optional[UserRole], expires_at: Optional[float] = None):
+        self.id = id
+        self.role = role
+        self.expires_at = expires_at
+
+class PrincipalCache:
+    """Size-bounded LRU of verified tokens to principals with a TTL per entry"""
+    
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, token: str, now: Optional[float] = None) -> Optional[Principal]:
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[0]
+    
+    def put(self, token: str, principal: Principal, token_expires_at: Optional[float] = None, now: Optional[float] = None):
+        """Cache a principal, never past the expiry of the token itself"""
+        now = time.time() if now is None else now
+        expires_at = now + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        
+        with self._lock:
+            self._entries[token] = (principal, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+principal_cache = PrincipalCache(settings.principal_cache_ttl_seconds, settings.principal_cache_max_entries)
+
+def resolve_principal(token: str) -> Optional[Principal]:
+    """Return the principal for a bearer token, or None if it is not valid
+    
+    Verified tokens are cached for a short TTL, so repeated calls skip the
+    signature check. Tokens issued before the role claim existed only carry
+    ``sub``: they resolve with ``role=None`` and are not cached until the
+    caller has looked the role up and passed it to ``remember_principal``.
+    
+    The role is read from the signed claim, not the users table, so a role
+    change only applies to tokens issued afterwards: a token already handed
+    out keeps its old role until it expires, i.e. for up to
+    ``access_token_expire_minutes``. The cache never outlives the token and
+    does not widen that window.
+    """
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    
+    payload = verify_token(token)
+    if not payload or not payload.get("sub"):
+        return None
+    
+    try:
+        user_id = uuid.UUID(str(payload["sub"]))
+        role = UserRole(payload["role"]) if payload.get("role") else None
+    except ValueError:
+        return None
+    
+    principal = Principal(user_id, role, payload.get("exp"))
+    if role is not None:
+        principal_cache.put(token, principal, principal.expires_at)
+    return principal
+
+def remember_principal(token: str, principal: Principal, role: UserRole) -> Principal:
+    """Cache a role-less token's principal once its role has been looked up"""
+    principal = Principal(principal.id, role, principal.expires_at)
+    principal_cache.put(token, principal, principal.expires_at)
+    return principal
@@ -0,0 +1,78 @@
+import base64
+import zlib
+from typing import Optional
+
+from sqlalchemy import Text
+from sqlalchemy.types import TypeDecorator
+
+from config import settings
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+# Compressed values are stored as PREFIX + codec + ":" + base64 payload. The
+# unit separator rarely occurs in extracted text, so plain rows written
+# before compression was enabled (or with it off) are read back unchanged; a
+# plain value that does start with it is stored as PREFIX + "plain:" + value.
+PREFIX = "\x1f"
+PLAIN_CODEC = "plain"
+
+def mark_plain(text: str) -> str:
+    """Store text uncompressed, escaping it when it would read as compressed"""
+    return f"{PREFIX}{PLAIN_CODEC}:{text}" if text.startswith(PREFIX) else text
+
+def compress_text(text: str, codec: str) -> str:
+    data = text.encode("utf-8")
+    if codec == "zlib":
+        payload = zlib.compress(data, settings.resume_compression_level)
+    elif codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("RESUME_COMPRESSION=zstd requires the zstandard package")
+        payload = zstandard.ZstdCompressor(level=settings.resume_compression_level).compress(data)
+    else:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    return f"{PREFIX}{codec}:{base64.b64encode(payload).decode('ascii')}"
+
+def decompress_text(value: str) -> str:
+    """Inverse of compress_text; plain text is returned as is"""
+    if not value.startswith(PREFIX):
+        return value
+    codec, _, payload = value[len(PREFIX):].partition(":")
+    if codec == PLAIN_CODEC:
+        return payload
+    data = base64.b64decode(payload)
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading zstd-compressed content requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+class CompressedText(TypeDecorator):
+    """Text column compressed on write when RESUME_COMPRESSION is set
+    
+    The codec is read from settings at bind time. Values shorter than
+    resume_compression_min_bytes, or that do not shrink, are stored plain.
+    Comparisons (LIKE, =) bind their operand as plain text and so only
+    match rows stored plain.
+    """
+    impl = Text
+    cache_ok = True
+    
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[str]:
+        codec = settings.resume_compression
+        if value is None:
+            return None
+        if codec == "none" or len(value) < settings.resume_compression_min_bytes:
+            return mark_plain(value)
+        compressed = compress_text(value, codec)
+        return compressed if len(compressed) < len(value) else mark_plain(value)
+    
+    def process_result_value(self, value: Optional[str], dialect) -> Optional[str]:
+        return decompress_text(value) if value is not None else None
+    
+    def coerce_compared_value(self, op, value):
+        return Text()
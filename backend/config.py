@@ -4,21 +4,76 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     # Database
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./resumerag.db")
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0  # seconds to wait for a pooled connection
+    db_pool_recycle: int = 1800  # seconds; -1 disables
+    
+    # SQLite connection tuning, applied on every new connection
+    sqlite_journal_mode: str = "WAL"  # readers no longer block on a writer's commit
+    sqlite_synchronous: str = "NORMAL"  # safe with WAL, fsyncs only at checkpoints
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kb: int = 64 * 1024  # page cache per connection
+    sqlite_mmap_size: int = 256 * 1024 * 1024
     
     # Security
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    principal_cache_ttl_seconds: float = 60.0  # verified tokens skip decoding and the user lookup
+    principal_cache_max_entries: int = 10000
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 64  # hashes waiting beyond this get 503 + Retry-After
+    password_hash_retry_after: int = 2  # seconds
+    # Bootstrap admin, created or promoted at startup when ADMIN_EMAIL is set;
+    # backend/admin.py does the same from the command line
+    admin_email: str = os.getenv("ADMIN_EMAIL", "")
+    admin_password: str = os.getenv("ADMIN_PASSWORD", "")
+    admin_full_name: str = "Administrator"
     
     # Redis (for rate limiting)
     redis_url: str = os.getenv("REDIS_URL", "")
+    redis_max_connections: int = 50
+    redis_socket_timeout: float = 0.1  # seconds, before falling back to local limiting
     
     # File upload
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     allowed_file_types: list = ['.pdf', '.docx', '.doc', '.txt', '.zip']
     
+    # Resume body compression: none | zlib | zstd (needs the zstandard package).
+    # Applies to new writes; stored rows are read whichever way they were written.
+    resume_compression: str = os.getenv("RESUME_COMPRESSION", "none")
+    resume_compression_level: int = 6
+    resume_compression_min_bytes: int = 512
+    # Text search (q) cannot use SQL on compressed bodies and decompresses them
+    # instead; only the user's most recent rows up to this many are searched
+    compressed_search_max_rows: int = int(os.getenv("COMPRESSED_SEARCH_MAX_ROWS", "500"))
+    
+    # Parse cache (keyed by sha256 of uploaded bytes)
+    parse_cache_max_entries: int = 1024
+    parse_cache_max_bytes: int = 64 * 1024 * 1024  # 64MB of extracted text
+    
+    # PDF extraction
+    pdf_max_pages: int = 50
+    pdf_parse_timeout_seconds: float = 20.0
+    pdf_parse_workers: int = 4
+    pdf_parallel_min_pages: int = 8  # smaller files are extracted inline
+    
+    # Idempotency-Key handling for POST endpoints
+    idempotency_ttl_seconds: int = 24 * 60 * 60  # stored responses are replayed this long
+    idempotency_wait_seconds: float = 30.0  # duplicates wait this long for the first request, then get 409
+    idempotency_lock_seconds: int = 300  # an unfinished claim older than this is treated as abandoned
+    idempotency_poll_interval: float = 0.2  # seconds; waiting on a request held by another worker
+    
     # Rate limiting
     rate_limit_per_minute: int = 60
+    # Expensive operations are also charged these weights against a separate
+    # per-minute budget, roughly in proportion to the CPU they use
+    rate_limit_expensive_per_minute: int = 100
+    rate_limit_costs: dict = {"ask": 5, "match": 10, "bulk_upload": 20}
+    rate_limit_mode: str = os.getenv("RATE_LIMIT_MODE", "redis")  # redis | hybrid (memory without REDIS_URL)
+    rate_limit_lease_size: int = 10  # hybrid: requests a worker may admit between syncs
+    rate_limit_sync_interval: float = 1.0  # hybrid: seconds between reconciliations
     
     class Config:
         env_file = ".env"
@@ -1,21 +1,99 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from typing import Any, Dict
 import os
 
+from config import settings
+
 # Database URL - use SQLite for simplicity, can be changed to PostgreSQL
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./resumerag.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+def async_database_url(url: str) -> str:
+    """Map a sync database URL onto its asyncio driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgres://", "postgresql://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+def _is_memory_sqlite(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:" or database.startswith("file::memory:")
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """PRAGMAs run on every new SQLite connection, in order"""
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        # Negative cache_size is in KiB rather than pages
+        "cache_size": -settings.sqlite_cache_size_kb,
+        "mmap_size": settings.sqlite_mmap_size,
+    }
+
+def _install_sqlite_pragmas(sync_engine: Engine):
+    pragmas = sqlite_pragmas()
+    
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"pool_pre_ping": not url.startswith("sqlite")}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+        if _is_memory_sqlite(url):
+            # In-memory databases live on a single connection, no pool to size
+            return options
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    return options
+
+def create_db_engine(url: str = DATABASE_URL) -> Engine:
+    """Create a sync engine with pool settings and, for SQLite, connection PRAGMAs"""
+    db_engine = create_engine(url, **_engine_options(url))
+    if url.startswith("sqlite"):
+        _install_sqlite_pragmas(db_engine)
+    return db_engine
+
+def create_async_db_engine(url: str = DATABASE_URL) -> AsyncEngine:
+    """Async counterpart of create_db_engine; url is the sync URL"""
+    db_engine = create_async_engine(async_database_url(url), **_engine_options(url))
+    if url.startswith("sqlite"):
+        _install_sqlite_pragmas(db_engine.sync_engine)
+    return db_engine
+
+# Sync engine for background embedding work, scripts and schema creation
+engine = create_db_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for request handlers, so queries do not block the event loop
+async_engine = create_async_db_engine(DATABASE_URL)
+
+# Objects stay loaded after commit: attribute access must not trigger lazy IO
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
@@ -1,13 +1,60 @@
 import json
+import uuid
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
+from typing import List, Dict, Any, NamedTuple, Optional, Sequence, Tuple
 import asyncio
+from sqlalchemy import Select, insert
 from sqlalchemy.orm import Session
 from database import SessionLocal
-from models import ResumeEmbedding
+from models import Resume, ResumeEmbedding
 import re
 
+# (resume_id, content, text_hash, sections) for one resume to embed; text_hash
+# is the sha256 of the parsed text and keys reuse of already encoded chunks
+EmbeddingJob = Tuple[str, str, Optional[str], Optional[List[Tuple[str, str]]]]
+
+INSERT_BATCH_SIZE = 1000
+
+class Chunk(NamedTuple):
+    section: str
+    text: str
+    # Span in the whitespace-normalised resume content; None stores the text itself
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+def normalize_whitespace(text: str) -> str:
+    """The text chunk offsets index into: whitespace runs collapsed to one space"""
+    return re.sub(r'\s+', ' ', text.strip())
+
+def embedding_rows(
+    resume_id: str, chunks: Sequence[Chunk], embeddings: Sequence[Any]
+) -> List[Dict[str, Any]]:
+    """Build plain insert parameters for a resume's chunks; id and created_at use column defaults
+    
+    Chunks with a span are stored as offsets only, since the overlapping
+    chunk texts would otherwise duplicate most of the resume.
+    """
+    resume_uuid = resume_id if isinstance(resume_id, uuid.UUID) else uuid.UUID(str(resume_id))
+    return [
+        {
+            "resume_id": resume_uuid,
+            "chunk_text": chunk.text if chunk.start is None else "",
+            "start_offset": chunk.start,
+            "end_offset": chunk.end,
+            "section": chunk.section,
+            "embedding": embedding if isinstance(embedding, str) else json.dumps(embedding.tolist()),
+            "chunk_index": i
+        }
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+    ]
+
+def insert_embedding_rows(db: Session, rows: List[Dict[str, Any]], batch_size: int = INSERT_BATCH_SIZE):
+    """Write chunk rows as Core executemany INSERTs, skipping the ORM unit of work"""
+    statement = insert(ResumeEmbedding.__table__)
+    for start in range(0, len(rows), batch_size):
+        db.execute(statement, rows[start:start + batch_size])
+
 class EmbeddingService:
     def __init__(self):
         # Load a lightweight sentence transformer model
@@ -15,50 +62,153 @@ class EmbeddingService:
         self.chunk_size = 500
         self.chunk_overlap = 50
     
-    def generate_embeddings_async(self, resume_id: str, content: str):
+    def generate_embeddings_async(
+        self,
+        resume_id: str,
+        content: str,
+        text_hash: Optional[str] = None,
+        sections: Optional[List[Tuple[str, str]]] = None
+    ):
         """Generate embeddings for resume content asynchronously"""
-        asyncio.create_task(self._generate_embeddings_task(resume_id, content))
+        self.generate_embeddings_batch_async([(resume_id, content, text_hash, sections)])
     
-    async def _generate_embeddings_task(self, resume_id: str, content: str):
-        """Background task to generate embeddings"""
+    def generate_embeddings_batch_async(self, jobs: List[EmbeddingJob]):
+        """Generate embeddings for several resumes in one background task
+        
+        All chunks are encoded in a single model call and written in one
+        transaction, which is what makes bulk ingest cheap.
+        """
+        if jobs:
+            asyncio.create_task(self._generate_embeddings_task(jobs))
+    
+    async def _generate_embeddings_task(self, jobs: List[EmbeddingJob]):
+        """Background task to generate embeddings
+        
+        Encoding and the synchronous session both block, so they run in a
+        worker thread and leave the event loop free to serve requests.
+        """
         try:
-            # Split content into chunks
-            chunks = self._split_into_chunks(content)
-            
-            # Generate embeddings for each chunk
-            embeddings = self.model.encode(chunks)
-            
-            # Store in database
-            db = SessionLocal()
-            try:
-                for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                    embedding_record = ResumeEmbedding(
-                        resume_id=resume_id,
-                        chunk_text=chunk,
-                        embedding=json.dumps(embedding.tolist()),
-                        chunk_index=i
-                    )
-                    db.add(embedding_record)
-                
-                db.commit()
-            finally:
-                db.close()
+            await asyncio.to_thread(self._generate_embeddings, jobs)
         except Exception as e:
-            print(f"Error generating embeddings for resume {resume_id}: {e}")
+            resume_ids = ", ".join(str(job[0]) for job in jobs)
+            print(f"Error generating embeddings for resume(s) {resume_ids}: {e}")
+    
+    def _generate_embeddings(self, jobs: List[EmbeddingJob]):
+        db = SessionLocal()
+        try:
+            insert_embedding_rows(db, self._build_embedding_rows(db, jobs))
+            db.commit()
+        finally:
+            db.close()
+    
+    def _build_embedding_rows(self, db: Session, jobs: List[EmbeddingJob]) -> List[Dict[str, Any]]:
+        rows = []
+        to_encode = []  # (resume_id, chunks) in encoding order
+        by_hash = {}  # text_hash -> index into to_encode, for duplicates within the batch
+        aliases = []  # (resume_id, index into to_encode)
+        
+        for resume_id, content, text_hash, sections in jobs:
+            # Identical parsed text was already chunked and encoded once
+            if text_hash in by_hash:
+                aliases.append((resume_id, by_hash[text_hash]))
+                continue
+            if text_hash:
+                donor_rows = self._existing_embedding_rows(db, resume_id, text_hash)
+                if donor_rows:
+                    rows.extend(donor_rows)
+                    continue
+            
+            # Split each section into chunks so no chunk straddles a header
+            chunks = self._split_sections_into_chunks(sections or [("general", content)], content)
+            if chunks:
+                if text_hash:
+                    by_hash[text_hash] = len(to_encode)
+                to_encode.append((resume_id, chunks))
+        
+        if not to_encode:
+            return rows
+        
+        embeddings = self.model.encode([chunk.text for _, chunks in to_encode for chunk in chunks])
+        
+        encoded = []
+        offset = 0
+        for resume_id, chunks in to_encode:
+            encoded.append(embeddings[offset:offset + len(chunks)])
+            rows.extend(embedding_rows(resume_id, chunks, encoded[-1]))
+            offset += len(chunks)
+        
+        for resume_id, index in aliases:
+            rows.extend(embedding_rows(resume_id, to_encode[index][1], encoded[index]))
+        
+        return rows
+    
+    def _existing_embedding_rows(self, db: Session, resume_id: str, text_hash: str) -> List[Dict[str, Any]]:
+        """Chunk rows cloned from another resume with the same parsed text, if there is one"""
+        donor_id = db.query(ResumeEmbedding.resume_id).join(
+            Resume, Resume.id == ResumeEmbedding.resume_id
+        ).filter(
+            Resume.text_hash == text_hash,
+            Resume.id != uuid.UUID(str(resume_id))
+        ).limit(1).scalar()
+        
+        if donor_id is None:
+            return []
+        
+        donor_chunks = db.query(
+            ResumeEmbedding.section,
+            ResumeEmbedding.chunk_text,
+            ResumeEmbedding.start_offset,
+            ResumeEmbedding.end_offset,
+            ResumeEmbedding.embedding
+        ).filter(
+            ResumeEmbedding.resume_id == donor_id
+        ).order_by(ResumeEmbedding.chunk_index).all()
+        
+        # Same text splits into the same sections and chunks, so the donor's offsets apply as is
+        return embedding_rows(
+            resume_id,
+            [Chunk(row.section, row.chunk_text, row.start_offset, row.end_offset) for row in donor_chunks],
+            [row.embedding for row in donor_chunks]
+        )
+    
+    def _split_sections_into_chunks(self, sections: List[Tuple[str, str]], content: str) -> List[Chunk]:
+        """Chunk each (section, text) block independently, tagging chunks with their section
+        
+        Sections are consecutive slices of ``content``, so each normalised
+        block is found in the normalised content and its chunks get spans
+        there. A block that cannot be located keeps its chunk texts.
+        """
+        normalized = normalize_whitespace(content)
+        cursor = 0
+        chunks = []
+        for section, text in sections:
+            text = normalize_whitespace(text)
+            base = normalized.find(text, cursor)
+            if base != -1:
+                cursor = base + len(text)
+            for start, end in self._chunk_bounds(text):
+                if base == -1:
+                    chunks.append(Chunk(section, text[start:end]))
+                else:
+                    chunks.append(Chunk(section, text[start:end], base + start, base + end))
+        return chunks
     
     def _split_into_chunks(self, text: str) -> List[str]:
         """Split text into overlapping chunks"""
         # Clean and normalize text
-        text = re.sub(r'\s+', ' ', text.strip())
-        
-        chunks = []
+        text = normalize_whitespace(text)
+        return [text[start:end] for start, end in self._chunk_bounds(text)]
+    
+    def _chunk_bounds(self, text: str) -> List[Tuple[int, int]]:
+        """(start, end) of overlapping chunks of normalised text"""
+        bounds = []
         start = 0
         
         while start < len(text):
             end = start + self.chunk_size
             
             if end >= len(text):
-                chunks.append(text[start:])
+                bounds.append((start, len(text)))
                 break
             
             # Try to break at sentence boundary
@@ -66,19 +216,23 @@ class EmbeddingService:
             if sentence_end > start + self.chunk_size // 2:
                 end = sentence_end + 1
             
-            chunks.append(text[start:end])
+            bounds.append((start, end))
             start = end - self.chunk_overlap
         
-        return chunks
+        return bounds
     
-    def search(self, query: str, resume_ids: List[str], k: int = 5) -> List[Dict[str, Any]]:
-        """Search for relevant content in resumes"""
+    def search(
+        self,
+        query: str,
+        resume_ids: Select,
+        k: int = 5,
+        sections: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for relevant content in resumes, optionally restricted to some sections"""
         db = SessionLocal()
         try:
             # Get all embeddings for the specified resumes
-            embeddings = db.query(ResumeEmbedding).filter(
-                ResumeEmbedding.resume_id.in_(resume_ids)
-            ).all()
+            embeddings = self._candidate_embeddings(db, resume_ids, sections)
             
             if not embeddings:
                 return []
@@ -87,35 +241,44 @@ class EmbeddingService:
             query_embedding = self.model.encode([query])[0]
             
             # Calculate similarities
-            results = []
+            scored = []
             for embedding in embeddings:
                 stored_embedding = np.array(json.loads(embedding.embedding))
                 similarity = np.dot(query_embedding, stored_embedding) / (
                     np.linalg.norm(query_embedding) * np.linalg.norm(stored_embedding)
                 )
-                
-                results.append({
-                    'resume_id': str(embedding.resume_id),
-                    'chunk_text': embedding.chunk_text,
-                    'score': float(similarity),
-                    'snippet': self._extract_snippet(embedding.chunk_text, query)
-                })
+                scored.append((float(similarity), embedding))
+            
+            # Sort by similarity and keep top k; only their text is loaded
+            scored.sort(key=lambda x: x[0], reverse=True)
+            scored = scored[:k]
+            texts = self._chunk_texts(db, [embedding for _, embedding in scored])
             
-            # Sort by similarity and return top k
-            results.sort(key=lambda x: x['score'], reverse=True)
-            return results[:k]
+            return [
+                {
+                    'resume_id': str(embedding.resume_id),
+                    'chunk_text': texts[embedding.id],
+                    'score': score,
+                    'snippet': self._extract_snippet(texts[embedding.id], query)
+                }
+                for score, embedding in scored
+            ]
             
         finally:
             db.close()
     
-    def match_job_to_resumes(self, job_description: str, resume_ids: List[str], top_n: int = 10) -> List[Dict[str, Any]]:
+    def match_job_to_resumes(
+        self,
+        job_description: str,
+        resume_ids: Select,
+        top_n: int = 10,
+        sections: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
         """Match job description to resumes"""
         db = SessionLocal()
         try:
             # Get all embeddings for the specified resumes
-            embeddings = db.query(ResumeEmbedding).filter(
-                ResumeEmbedding.resume_id.in_(resume_ids)
-            ).all()
+            embeddings = self._candidate_embeddings(db, resume_ids, sections)
             
             if not embeddings:
                 return []
@@ -133,7 +296,7 @@ class EmbeddingService:
                 
                 results.append({
                     'resume_id': str(embedding.resume_id),
-                    'chunk_text': embedding.chunk_text,
+                    'chunk': embedding,
                     'score': float(similarity)
                 })
             
@@ -145,37 +308,71 @@ class EmbeddingService:
                     resume_scores[resume_id] = []
                 resume_scores[resume_id].append(result['score'])
             
-            # Calculate final scores and evidence
+            # Calculate final scores and evidence chunks
             final_results = []
             for resume_id, scores in resume_scores.items():
                 avg_score = sum(scores) / len(scores)
-                max_score = max(scores)
                 
-                # Get evidence snippets
+                # Get evidence chunks
                 evidence = [
-                    r['chunk_text'] for r in results 
+                    r['chunk'] for r in results 
                     if r['resume_id'] == resume_id and r['score'] > avg_score * 0.8
                 ][:3]  # Top 3 evidence snippets
                 
-                # Extract missing requirements (simplified)
-                missing_requirements = self._extract_missing_requirements(
-                    job_description, evidence
-                )
-                
                 final_results.append({
                     'resume_id': resume_id,
                     'score': avg_score,
-                    'evidence': evidence,
-                    'missing_requirements': missing_requirements
+                    'evidence': evidence
                 })
             
-            # Sort by score and return top n
+            # Sort by score and keep top n; only their evidence text is loaded
             final_results.sort(key=lambda x: x['score'], reverse=True)
-            return final_results[:top_n]
+            final_results = final_results[:top_n]
+            texts = self._chunk_texts(db, [chunk for result in final_results for chunk in result['evidence']])
+            
+            for result in final_results:
+                result['evidence'] = [texts[chunk.id] for chunk in result['evidence']]
+                # Extract missing requirements (simplified)
+                result['missing_requirements'] = self._extract_missing_requirements(
+                    job_description, result['evidence']
+                )
+            return final_results
             
         finally:
             db.close()
     
+    def _candidate_embeddings(
+        self,
+        db: Session,
+        resume_ids: Select,
+        sections: Optional[List[str]] = None
+    ) -> List[ResumeEmbedding]:
+        """Load the chunks to score, applying the section filter in SQL
+        
+        ``resume_ids`` is a select of resume ids, used as a subquery so the
+        candidate set is never loaded into memory.
+        """
+        query = db.query(ResumeEmbedding).filter(ResumeEmbedding.resume_id.in_(resume_ids))
+        if sections:
+            query = query.filter(ResumeEmbedding.section.in_(sections))
+        return query.all()
+    
+    def _chunk_texts(self, db: Session, chunks: List[ResumeEmbedding]) -> Dict[uuid.UUID, str]:
+        """Chunk texts by chunk id, sliced from the parent resumes for offset-only rows"""
+        resume_ids = {chunk.resume_id for chunk in chunks if chunk.start_offset is not None}
+        contents = {}
+        if resume_ids:
+            contents = {
+                resume_id: normalize_whitespace(content)
+                for resume_id, content in db.query(Resume.id, Resume.content).filter(Resume.id.in_(resume_ids))
+            }
+        
+        return {
+            chunk.id: chunk.chunk_text if chunk.start_offset is None
+            else contents.get(chunk.resume_id, "")[chunk.start_offset:chunk.end_offset]
+            for chunk in chunks
+        }
+    
     def _extract_snippet(self, text: str, query: str, max_length: int = 200) -> str:
         """Extract a relevant snippet around the query"""
         query_lower = query.lower()
@@ -0,0 +1,175 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from config import settings
+from database import AsyncSessionLocal
+from models import IdempotencyRecord
+
+IN_FLIGHT = "in_flight"
+COMPLETED = "completed"
+
+class IdempotencyMismatch(Exception):
+    """The key was already used for a request with a different fingerprint"""
+
+class IdempotencyInProgress(Exception):
+    """The request holding the key did not finish within the wait timeout"""
+
+class IdempotencyStore:
+    """Database-backed record of Idempotency-Key -> fingerprint -> response
+    
+    The first request for a (user, key) pair claims it by inserting an
+    in-flight row; the primary key makes the claim atomic across workers.
+    Duplicates wait for that request to finish, on an asyncio event when it
+    runs in this process and by polling the row otherwise, then replay the
+    stored response. Failed requests release the key so a retry runs again.
+    """
+    
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        ttl_seconds: int = settings.idempotency_ttl_seconds,
+        wait_seconds: float = settings.idempotency_wait_seconds,
+        lock_seconds: int = settings.idempotency_lock_seconds,
+        poll_interval: float = settings.idempotency_poll_interval
+    ):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.lock_seconds = lock_seconds
+        self.poll_interval = poll_interval
+        # Claims held by requests in this process, set when they finish
+        self._in_flight: Dict[Tuple[uuid.UUID, str], asyncio.Event] = {}
+        self._next_purge = 0.0
+    
+    async def acquire(self, user_id: uuid.UUID, key: str, fingerprint: str) -> Optional[IdempotencyRecord]:
+        """Claim the key for this request, or return the completed record to replay
+        
+        Returns None when the caller now holds the key and must finish with
+        complete() or release().
+        """
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            claimed, record, error = await self._claim(user_id, key, fingerprint)
+            if claimed:
+                self._in_flight[(user_id, key)] = asyncio.Event()
+                return None
+            if record is None:
+                # Either released between our insert and lookup, or the insert
+                # failed for another reason (e.g. a foreign key): retry with
+                # the same deadline and backoff, then surface the error
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise error
+                await asyncio.sleep(min(self.poll_interval, remaining))
+                continue
+            if record.fingerprint != fingerprint:
+                raise IdempotencyMismatch("Idempotency-Key was used with a different request")
+            if record.status == COMPLETED:
+                return record
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise IdempotencyInProgress("Request with this Idempotency-Key is still in progress")
+            await self._wait(user_id, key, remaining)
+    
+    async def complete(self, user_id: uuid.UUID, key: str, status: int, content_type: Optional[str], body: bytes):
+        """Store the response for replay and wake waiting duplicates"""
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(IdempotencyRecord)
+                    .where(IdempotencyRecord.user_id == user_id, IdempotencyRecord.key == key)
+                    .values(
+                        status=COMPLETED,
+                        response_status=status,
+                        response_content_type=content_type,
+                        response_body=body
+                    )
+                )
+                await db.commit()
+        finally:
+            self._finish(user_id, key)
+    
+    async def release(self, user_id: uuid.UUID, key: str):
+        """Drop an unfinished claim so the next attempt runs the request again"""
+        try:
+            async with self.session_factory() as db:
+                await db.execute(delete(IdempotencyRecord).where(
+                    IdempotencyRecord.user_id == user_id,
+                    IdempotencyRecord.key == key,
+                    IdempotencyRecord.status == IN_FLIGHT
+                ))
+                await db.commit()
+        finally:
+            self._finish(user_id, key)
+    
+    async def purge_expired(self) -> int:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(IdempotencyRecord).where(IdempotencyRecord.expires_at <= datetime.utcnow())
+            )
+            await db.commit()
+            return result.rowcount
+    
+    async def _claim(
+        self, user_id: uuid.UUID, key: str, fingerprint: str
+    ) -> Tuple[bool, Optional[IdempotencyRecord], Optional[IntegrityError]]:
+        if time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + min(self.ttl_seconds, 3600)
+            await self.purge_expired()
+        
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            # An expired record, or a claim whose worker died, frees the key
+            await db.execute(delete(IdempotencyRecord).where(
+                IdempotencyRecord.user_id == user_id,
+                IdempotencyRecord.key == key,
+                or_(
+                    IdempotencyRecord.expires_at <= now,
+                    and_(
+                        IdempotencyRecord.status == IN_FLIGHT,
+                        IdempotencyRecord.created_at <= now - timedelta(seconds=self.lock_seconds)
+                    )
+                )
+            ))
+            db.add(IdempotencyRecord(
+                user_id=user_id,
+                key=key,
+                fingerprint=fingerprint,
+                status=IN_FLIGHT,
+                created_at=now,
+                expires_at=now + timedelta(seconds=self.ttl_seconds)
+            ))
+            try:
+                await db.commit()
+                return True, None, None
+            except IntegrityError as e:
+                await db.rollback()
+                error = e
+            
+            return False, await db.scalar(select(IdempotencyRecord).where(
+                IdempotencyRecord.user_id == user_id,
+                IdempotencyRecord.key == key
+            )), error
+    
+    async def _wait(self, user_id: uuid.UUID, key: str, remaining: float):
+        """Sleep until the holder finishes: its event if local, else one poll interval"""
+        event = self._in_flight.get((user_id, key))
+        if event is None:
+            await asyncio.sleep(min(self.poll_interval, remaining))
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout=remaining)
+        except asyncio.TimeoutError:
+            pass
+    
+    def _finish(self, user_id: uuid.UUID, key: str):
+        event = self._in_flight.pop((user_id, key), None)
+        if event is not None:
+            event.set()
@@ -1,7 +1,11 @@
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import load_only, undefer
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 import os
 import uuid
@@ -13,25 +17,59 @@ import zipfile
 import io
 from pathlib import Path
 
-from database import get_db, engine, Base
-from models import User, Resume, Job, ResumeEmbedding, UserRole
+from database import get_db, engine
+from models import User, Resume, Job, ResumeEmbedding, ResumeField, UserRole
 from schemas import (
-    UserCreate, UserLogin, UserResponse, ResumeResponse, ResumeUpload,
+    UserCreate, UserLogin, UserResponse, ResumeResponse, ResumeSummary, ResumeUpload,
     JobCreate, JobResponse, AskRequest, AskResponse, MatchRequest, MatchResponse,
-    ErrorResponse, PaginatedResponse
+    ErrorResponse, PaginatedResponse, CandidateFilters, PIIAuditResponse
+)
+from auth import (
+    create_user_token, resolve_principal, remember_principal, Principal,
+    get_password_hash_async, verify_password_async, PasswordHasherBusy
 )
-from auth import create_access_token, verify_token, get_password_hash, verify_password
 from rate_limiter import RateLimiter
-from resume_parser import ResumeParser
+from middleware import IdempotencyMiddleware, RateLimitMiddleware
+from idempotency import IdempotencyStore
+from resume_parser import (
+    ResumeParser, ResumeParseError, SECTION_NAMES, canonical_degree, canonical_skill, canonical_title
+)
 from embedding_service import EmbeddingService
-from pii_redactor import PIIRedactor
+from pii_redactor import PIIRedactor, iter_chunks
+from pii_audit import run_audit, AUDIT_TYPES
+from migrations import migrate
+from admin import provision_admin
+from pagination import keyset_page, offset_page, count_rows, InvalidCursor
+from compression import PREFIX as COMPRESSED_PREFIX
+from config import settings
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Bring the schema up to date (creates tables on a fresh database)
+migrate(engine)
+if settings.admin_email:
+    provision_admin(engine, settings.admin_email, settings.admin_password, settings.admin_full_name)
 
 app = FastAPI(title="ResumeRAG API", version="1.0.0")
 
-# CORS middleware
+# Idempotency-Key handling for every POST endpoint: retries replay the stored
+# response and concurrent duplicates wait for the first request. Added before
+# the rate limiter so it runs inside it.
+idempotency_store = IdempotencyStore()
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+
+# Rate limiter, applied before routing so rejected requests never reach
+# token verification or the database
+rate_limiter = RateLimiter()
+app.add_middleware(
+    RateLimitMiddleware,
+    limiter=rate_limiter,
+    operations=[
+        ("POST", r"^/api/ask$", "ask"),
+        ("POST", r"^/api/jobs/[^/]+/match$", "match"),
+        ("POST", r"^/api/resumes/bulk$", "bulk_upload"),
+    ],
+)
+
+# CORS middleware, added last so it stays outermost and 429s carry CORS headers
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Open during judging
@@ -40,8 +78,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Rate limiter
-rate_limiter = RateLimiter()
 security = HTTPBearer()
 
 # Services
@@ -49,35 +85,144 @@ resume_parser = ResumeParser()
 embedding_service = EmbeddingService()
 pii_redactor = PIIRedactor()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    """Get current authenticated user"""
-    try:
-        payload = verify_token(credentials.credentials)
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user = db.query(User).filter(User.id == user_id).first()
-        if user is None:
-            raise HTTPException(status_code=401, detail="User not found")
-        
-        return user
-    except Exception as e:
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """Get the authenticated principal from the token claims
+    
+    Only tokens issued before the role claim existed fall back to a user
+    lookup; handlers that need the full row load it themselves.
+    """
+    principal = resolve_principal(credentials.credentials)
+    if principal is not None and principal.role is None:
+        role = await db.scalar(select(User.role).where(User.id == principal.id))
+        principal = remember_principal(credentials.credentials, principal, role) if role else None
+    
+    if principal is None:
         raise HTTPException(status_code=401, detail="Invalid authentication")
+    return principal
 
-def check_rate_limit(user_id: str):
-    """Check rate limit for user"""
-    if not rate_limiter.is_allowed(user_id):
+def _server_busy(exc: PasswordHasherBusy) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail={"error": {"code": "SERVER_BUSY", "message": "Too many sign-in attempts, retry shortly"}},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+async def hash_password(password: str) -> str:
+    """Hash off the event loop, shedding load with 503 when the queue is full"""
+    try:
+        return await get_password_hash_async(password)
+    except PasswordHasherBusy as exc:
+        raise _server_busy(exc)
+
+async def check_password(password: str, hashed_password: str) -> bool:
+    """Verify off the event loop, shedding load with 503 when the queue is full"""
+    try:
+        return await verify_password_async(password, hashed_password)
+    except PasswordHasherBusy as exc:
+        raise _server_busy(exc)
+
+def _normalize_sections(sections: Optional[List[str]]) -> Optional[List[str]]:
+    """Validate a section filter against the sections produced at ingest"""
+    if not sections:
+        return None
+    
+    normalized = [section.strip().lower() for section in sections]
+    unknown = [section for section in normalized if section not in SECTION_NAMES]
+    if unknown:
         raise HTTPException(
-            status_code=429,
-            detail={"error": {"code": "RATE_LIMIT", "message": "Rate limit exceeded"}}
+            status_code=400,
+            detail={"error": {"code": "INVALID_SECTION", "message": f"Unknown sections: {', '.join(unknown)}"}}
         )
+    return normalized
+
+def _refresh_pii_columns(resume: Resume):
+    """Recompute the spans and preview if they predate the current pattern set"""
+    if resume.pii_version != pii_redactor.version or resume.pii_spans is None:
+        for column, value in pii_redactor.ingest_columns(resume.content).items():
+            setattr(resume, column, value)
+
+def _redacted_content(resume: Resume) -> str:
+    """Apply the stored PII spans, recomputing them if the pattern set has changed"""
+    _refresh_pii_columns(resume)
+    return pii_redactor.apply_spans(resume.content, json.loads(resume.pii_spans))
+
+def _resume_fields(fields: Dict[str, Any]) -> List[ResumeField]:
+    """Build the side-table rows for the structured fields extracted at ingest"""
+    rows = []
+    for kind, key in (("skill", "skills"), ("title", "titles"), ("degree", "degrees")):
+        rows.extend(ResumeField(kind=kind, value=value) for value in fields[key])
+    return rows
+
+def _as_uuid(value: str) -> Optional[uuid.UUID]:
+    """Parse a path id; None (matching no row) when it is not a UUID"""
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        return None
+
+def _candidate_ids(user_id: uuid.UUID, filters: Optional[CandidateFilters]):
+    """Select of the user's resume ids passing the structured filters, for use as a subquery"""
+    return _apply_candidate_filters(select(Resume.id).where(Resume.user_id == user_id), filters)
+
+async def _filenames(db: AsyncSession, resume_ids: List[str]) -> Dict[str, str]:
+    """Filenames of the given resumes in one keyed query"""
+    if not resume_ids:
+        return {}
+    rows = await db.execute(select(Resume.id, Resume.filename).where(
+        Resume.id.in_({uuid.UUID(resume_id) for resume_id in resume_ids})
+    ))
+    return {str(resume_id): filename for resume_id, filename in rows}
+
+async def _compressed_resumes_containing(db: AsyncSession, user_id: uuid.UUID, q: str) -> List[uuid.UUID]:
+    """Ids of the user's compressed resumes whose body contains q, case-insensitively
+    
+    SQL cannot look inside compressed bodies, so they are streamed and
+    searched after decompression; plain rows are skipped by the prefix test.
+    That costs a read and a decompression per body, so only the most recent
+    compressed_search_max_rows are scanned and older compressed resumes do
+    not match. Deployments that rely on full-corpus search should leave
+    RESUME_COMPRESSION off.
+    """
+    needle = q.lower()
+    rows = await db.stream(
+        select(Resume.id, Resume.content).where(
+            Resume.user_id == user_id,
+            Resume.content.like(f"{COMPRESSED_PREFIX}%")
+        ).order_by(
+            Resume.created_at.desc(), Resume.id.desc()
+        ).limit(settings.compressed_search_max_rows).execution_options(yield_per=100)
+    )
+    return [resume_id async for resume_id, content in rows if needle in content.lower()]
+
+def _apply_candidate_filters(query, filters: Optional[CandidateFilters]):
+    """Narrow a Resume select with structured field filters, evaluated in SQL"""
+    if filters is None:
+        return query
+    
+    def with_field(kind: str, values: List[str]):
+        return Resume.id.in_(
+            select(ResumeField.resume_id).where(ResumeField.kind == kind, ResumeField.value.in_(values))
+        )
+    
+    # Query values go through the same canonicalisation as the stored fields
+    for skill in filters.skills or []:
+        query = query.filter(with_field("skill", [canonical_skill(skill)]))
+    if filters.titles:
+        query = query.filter(with_field("title", [canonical_title(title) for title in filters.titles]))
+    if filters.degrees:
+        query = query.filter(with_field("degree", [canonical_degree(degree) for degree in filters.degrees]))
+    if filters.min_years is not None:
+        query = query.filter(Resume.years_experience >= filters.min_years)
+    return query
 
 @app.post("/api/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User.id).where(User.email == user_data.email))
     if existing_user:
         raise HTTPException(
             status_code=400,
@@ -85,7 +230,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -94,11 +239,10 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     
     # Create access token
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_user_token(user)
     
     return UserResponse(
         id=str(user.id),
@@ -109,16 +253,16 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
 @app.post("/api/login", response_model=UserResponse)
-async def login(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login(login_data: UserLogin, db: AsyncSession = Depends(get_db)):
     """Login user"""
-    user = db.query(User).filter(User.email == login_data.email).first()
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    user = await db.scalar(select(User).where(User.email == login_data.email))
+    if not user or not await check_password(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=401,
             detail={"error": {"code": "INVALID_CREDENTIALS", "message": "Invalid credentials"}}
         )
     
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_user_token(user)
     
     return UserResponse(
         id=str(user.id),
@@ -132,20 +276,10 @@ async def login(login_data: UserLogin, db: Session = Depends(get_db)):
 async def upload_resume(
     file: UploadFile = File(...),
     idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Upload a resume file"""
-    check_rate_limit(str(current_user.id))
-    
-    # Check idempotency
-    if idempotency_key:
-        existing_resume = db.query(Resume).filter(
-            Resume.idempotency_key == idempotency_key,
-            Resume.user_id == current_user.id
-        ).first()
-        if existing_resume:
-            return ResumeResponse.from_orm(existing_resume)
     
     # Validate file type
     if not file.filename.lower().endswith(('.pdf', '.docx', '.doc', '.txt')):
@@ -157,23 +291,36 @@ async def upload_resume(
     # Read file content
     content = await file.read()
     
-    # Parse resume content
-    parsed_content = resume_parser.parse(content, file.filename)
+    # Parse off the event loop (identical files are served from the parse cache)
+    try:
+        document = await run_in_threadpool(resume_parser.parse_document, content, file.filename)
+    except ResumeParseError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": {"code": e.code, "message": e.message}}
+        )
+    parsed_content = document['text']
     
     # Create resume record
     resume = Resume(
         filename=file.filename,
         content=parsed_content,
+        content_hash=document['content_hash'],
+        text_hash=document['text_hash'],
+        years_experience=document['fields']['years_experience'],
+        fields=_resume_fields(document['fields']),
+        **pii_redactor.ingest_columns(parsed_content),
         user_id=current_user.id,
         idempotency_key=idempotency_key
     )
     
     db.add(resume)
-    db.commit()
-    db.refresh(resume)
+    await db.commit()
     
     # Generate embeddings asynchronously
-    embedding_service.generate_embeddings_async(str(resume.id), parsed_content)
+    embedding_service.generate_embeddings_async(
+        str(resume.id), parsed_content, resume.text_hash, document['sections']
+    )
     
     return ResumeResponse.from_orm(resume)
 
@@ -181,11 +328,10 @@ async def upload_resume(
 async def upload_resumes_bulk(
     file: UploadFile = File(...),
     idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Upload multiple resumes from ZIP file"""
-    check_rate_limit(str(current_user.id))
     
     if not file.filename.lower().endswith('.zip'):
         raise HTTPException(
@@ -201,29 +347,41 @@ async def upload_resumes_bulk(
             for filename in zip_file.namelist():
                 if filename.lower().endswith(('.pdf', '.docx', '.doc', '.txt')):
                     file_content = zip_file.read(filename)
-                    parsed_content = resume_parser.parse(file_content, filename)
+                    document = await run_in_threadpool(resume_parser.parse_document, file_content, filename)
                     
                     resume = Resume(
                         filename=filename,
-                        content=parsed_content,
+                        content=document['text'],
+                        content_hash=document['content_hash'],
+                        text_hash=document['text_hash'],
+                        years_experience=document['fields']['years_experience'],
+                        fields=_resume_fields(document['fields']),
+                        **pii_redactor.ingest_columns(document['text']),
                         user_id=current_user.id,
                         idempotency_key=idempotency_key
                     )
                     
                     db.add(resume)
-                    resumes.append(resume)
+                    resumes.append((resume, document['sections']))
         
-        db.commit()
+        await db.commit()
         
-        # Generate embeddings for all resumes
-        for resume in resumes:
-            db.refresh(resume)
-            embedding_service.generate_embeddings_async(str(resume.id), resume.content)
+        # Generate embeddings for all resumes in one batch
+        embedding_service.generate_embeddings_batch_async([
+            (str(resume.id), resume.content, resume.text_hash, sections)
+            for resume, sections in resumes
+        ])
         
-        return [ResumeResponse.from_orm(resume) for resume in resumes]
+        return [ResumeResponse.from_orm(resume) for resume, _ in resumes]
         
+    except ResumeParseError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail={"error": {"code": e.code, "message": f"{filename}: {e.message}"}}
+        )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=400,
             detail={"error": {"code": "BULK_UPLOAD_ERROR", "message": f"Error processing ZIP file: {str(e)}"}}
@@ -232,54 +390,99 @@ async def upload_resumes_bulk(
 @app.get("/api/resumes", response_model=PaginatedResponse)
 async def get_resumes(
     limit: int = Query(10, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    offset: Optional[int] = Query(None, ge=0),
+    include_total: Optional[bool] = Query(None),
+    fields: str = Query("summary", pattern="^(summary|full)$"),
     q: Optional[str] = Query(None),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    skills: Optional[List[str]] = Query(None),
+    titles: Optional[List[str]] = Query(None),
+    degrees: Optional[List[str]] = Query(None),
+    min_years: Optional[float] = Query(None, ge=0),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get resumes with pagination and search"""
-    check_rate_limit(str(current_user.id))
-    
-    query = db.query(Resume).filter(Resume.user_id == current_user.id)
+    """Get resumes newest first with cursor pagination, search and structured field filters
+    
+    Pass the returned next_cursor to fetch the following page; offset is
+    still accepted for older clients. The total is only counted on the
+    first page unless include_total is set. Items are summaries with a
+    redacted preview; fields=full returns bodies as GET /api/resumes/{id} does.
+    """
+    
+    if fields == "full":
+        columns = undefer(Resume.content)
+    else:
+        columns = load_only(Resume.id, Resume.filename, Resume.preview, Resume.pii_version, Resume.created_at)
+    query = select(Resume).options(columns).where(Resume.user_id == current_user.id)
+    query = _apply_candidate_filters(query, CandidateFilters(
+        skills=skills, titles=titles, degrees=degrees, min_years=min_years
+    ))
     
     if q:
-        # Simple text search in content
-        query = query.filter(Resume.content.ilike(f"%{q}%"))
-    
-    total = query.count()
-    resumes = query.offset(offset).limit(limit).all()
-    
-    # Redact PII if user is not a recruiter
-    resume_responses = []
-    for resume in resumes:
-        response = ResumeResponse.from_orm(resume)
-        if current_user.role != UserRole.RECRUITER:
-            response.content = pii_redactor.redact(response.content)
-        resume_responses.append(response)
+        # Simple text search in content: plain bodies in SQL, compressed ones here
+        query = query.filter(or_(
+            and_(Resume.content.notlike(f"{COMPRESSED_PREFIX}%"), Resume.content.ilike(f"%{q}%")),
+            Resume.id.in_(await _compressed_resumes_containing(db, current_user.id, q))
+        ))
+    
+    if include_total is None:
+        include_total = cursor is None and not offset
+    total = await count_rows(db, query) if include_total else None
+    
+    next_offset = None
+    if cursor is None and offset is not None:
+        resumes, next_offset, next_cursor = await offset_page(db, query, Resume, limit, offset)
+    else:
+        try:
+            resumes, next_cursor = await keyset_page(db, query, Resume, limit, cursor)
+        except InvalidCursor as e:
+            raise HTTPException(
+                status_code=400,
+                detail={"error": {"code": "INVALID_CURSOR", "message": str(e)}}
+            )
+    
+    if fields == "summary":
+        # Previews stored under an older pattern set are rebuilt with the spans
+        for resume in resumes:
+            if resume.pii_version != pii_redactor.version:
+                await db.refresh(resume, ["content"])
+                _refresh_pii_columns(resume)
+        resume_responses = [ResumeSummary.from_orm(resume) for resume in resumes]
+    else:
+        # Redact PII if user is not a recruiter
+        resume_responses = []
+        for resume in resumes:
+            response = ResumeResponse.from_orm(resume)
+            if current_user.role != UserRole.RECRUITER:
+                response.content = _redacted_content(resume)
+            resume_responses.append(response)
     
-    next_offset = offset + limit if offset + limit < total else None
+    # Persist spans and previews recomputed after a pattern change
+    if db.dirty:
+        await db.commit()
     
     return PaginatedResponse(
         items=resume_responses,
         total=total,
         limit=limit,
         offset=offset,
-        next_offset=next_offset
+        next_offset=next_offset,
+        next_cursor=next_cursor
     )
 
 @app.get("/api/resumes/{resume_id}", response_model=ResumeResponse)
 async def get_resume(
     resume_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific resume"""
-    check_rate_limit(str(current_user.id))
     
-    resume = db.query(Resume).filter(
-        Resume.id == resume_id,
+    resume = await db.scalar(select(Resume).options(undefer(Resume.content)).where(
+        Resume.id == _as_uuid(resume_id),
         Resume.user_id == current_user.id
-    ).first()
+    ))
     
     if not resume:
         raise HTTPException(
@@ -291,40 +494,81 @@ async def get_resume(
     
     # Redact PII if user is not a recruiter
     if current_user.role != UserRole.RECRUITER:
-        response.content = pii_redactor.redact(response.content)
+        response.content = _redacted_content(resume)
+        if db.dirty:
+            await db.commit()
     
     return response
 
+@app.get("/api/resumes/{resume_id}/content")
+async def stream_resume_content(
+    resume_id: str,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream a resume body as text, with PII redacted for non-recruiters
+    
+    The body is loaded whole; the stored spans are spliced in as it is sent,
+    so no redacted copy is built and the text is not scanned again unless
+    the spans predate the current pattern set.
+    """
+    
+    resume = await db.scalar(select(Resume).options(undefer(Resume.content)).where(
+        Resume.id == _as_uuid(resume_id),
+        Resume.user_id == current_user.id
+    ))
+    
+    if not resume:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": {"code": "RESUME_NOT_FOUND", "message": "Resume not found"}}
+        )
+    
+    if current_user.role == UserRole.RECRUITER:
+        chunks = iter_chunks(resume.content)
+    else:
+        _refresh_pii_columns(resume)
+        if db.dirty:
+            await db.commit()
+        chunks = pii_redactor.stream_spans(resume.content, json.loads(resume.pii_spans))
+    
+    return StreamingResponse(chunks, media_type="text/plain; charset=utf-8")
+
 @app.post("/api/ask", response_model=AskResponse)
 async def ask_question(
     request: AskRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Ask a question about resumes"""
-    check_rate_limit(str(current_user.id))
     
-    # Get user's resumes
-    resumes = db.query(Resume).filter(Resume.user_id == current_user.id).all()
+    # The user's resume ids, pre-filtered on structured fields; only the
+    # count is loaded here, the ids stay a subquery of the embedding scan
+    candidate_ids = _candidate_ids(current_user.id, request.filters)
+    resume_count = await count_rows(db, candidate_ids)
     
-    if not resumes:
+    if not resume_count:
         raise HTTPException(
             status_code=404,
             detail={"error": {"code": "NO_RESUMES", "message": "No resumes found"}}
         )
     
-    # Search for relevant content
-    results = embedding_service.search(request.query, [str(r.id) for r in resumes], request.k)
+    # Search for relevant content (model inference and the embedding scan block,
+    # so they run on the thread pool)
+    results = await run_in_threadpool(
+        embedding_service.search,
+        request.query, candidate_ids, request.k, _normalize_sections(request.sections)
+    )
     
     # Format response with evidence
-    answer = f"Based on your {len(resumes)} resume(s), here's what I found:"
+    answer = f"Based on your {resume_count} resume(s), here's what I found:"
+    filenames = await _filenames(db, [result['resume_id'] for result in results])
     evidence = []
     
     for result in results:
-        resume = next(r for r in resumes if str(r.id) == result['resume_id'])
         evidence.append({
-            "resume_id": str(resume.id),
-            "filename": resume.filename,
+            "resume_id": result['resume_id'],
+            "filename": filenames[result['resume_id']],
             "snippet": result['snippet'],
             "score": result['score']
         })
@@ -339,20 +583,10 @@ async def ask_question(
 async def create_job(
     job_data: JobCreate,
     idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new job posting"""
-    check_rate_limit(str(current_user.id))
-    
-    # Check idempotency
-    if idempotency_key:
-        existing_job = db.query(Job).filter(
-            Job.idempotency_key == idempotency_key,
-            Job.user_id == current_user.id
-        ).first()
-        if existing_job:
-            return JobResponse.from_orm(existing_job)
     
     job = Job(
         title=job_data.title,
@@ -363,24 +597,22 @@ async def create_job(
     )
     
     db.add(job)
-    db.commit()
-    db.refresh(job)
+    await db.commit()
     
     return JobResponse.from_orm(job)
 
 @app.get("/api/jobs/{job_id}", response_model=JobResponse)
 async def get_job(
     job_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific job"""
-    check_rate_limit(str(current_user.id))
     
-    job = db.query(Job).filter(
-        Job.id == job_id,
+    job = await db.scalar(select(Job).where(
+        Job.id == _as_uuid(job_id),
         Job.user_id == current_user.id
-    ).first()
+    ))
     
     if not job:
         raise HTTPException(
@@ -394,16 +626,15 @@ async def get_job(
 async def match_candidates(
     job_id: str,
     request: MatchRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Match candidates to a job"""
-    check_rate_limit(str(current_user.id))
     
-    job = db.query(Job).filter(
-        Job.id == job_id,
+    job = await db.scalar(select(Job).where(
+        Job.id == _as_uuid(job_id),
         Job.user_id == current_user.id
-    ).first()
+    ))
     
     if not job:
         raise HTTPException(
@@ -411,29 +642,31 @@ async def match_candidates(
             detail={"error": {"code": "JOB_NOT_FOUND", "message": "Job not found"}}
         )
     
-    # Get all resumes
-    resumes = db.query(Resume).filter(Resume.user_id == current_user.id).all()
+    # Candidate resume ids, pre-filtered on structured fields, as in ask_question
+    candidate_ids = _candidate_ids(current_user.id, request.filters)
     
-    if not resumes:
+    if not await db.scalar(select(candidate_ids.exists())):
         raise HTTPException(
             status_code=404,
             detail={"error": {"code": "NO_RESUMES", "message": "No resumes found"}}
         )
     
-    # Match candidates
-    matches = embedding_service.match_job_to_resumes(
+    # Match candidates on the thread pool, as in ask_question
+    matches = await run_in_threadpool(
+        embedding_service.match_job_to_resumes,
         job.description + " " + job.requirements,
-        [str(r.id) for r in resumes],
-        request.top_n
+        candidate_ids,
+        request.top_n,
+        _normalize_sections(request.sections)
     )
     
     # Format response
+    filenames = await _filenames(db, [match['resume_id'] for match in matches])
     candidates = []
     for match in matches:
-        resume = next(r for r in resumes if str(r.id) == match['resume_id'])
         candidates.append({
-            "resume_id": str(resume.id),
-            "filename": resume.filename,
+            "resume_id": match['resume_id'],
+            "filename": filenames[match['resume_id']],
             "match_score": match['score'],
             "evidence": match['evidence'],
             "missing_requirements": match['missing_requirements']
@@ -444,6 +677,30 @@ async def match_candidates(
         candidates=candidates
     )
 
+@app.get("/api/admin/pii-audit", response_model=PIIAuditResponse)
+async def pii_audit(
+    types: Optional[List[str]] = Query(None),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Report which stored resumes contain the given PII types (admin only)"""
+    
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=403,
+            detail={"error": {"code": "FORBIDDEN", "message": "Admin access required"}}
+        )
+    
+    try:
+        # Blocking: streams the table and waits on the worker processes
+        report = await run_in_threadpool(run_audit, types or AUDIT_TYPES)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": {"code": "INVALID_PII_TYPE", "message": str(e)}}
+        )
+    
+    return PIIAuditResponse(**report)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import re
+from typing import List, Optional, Tuple
+
+from auth import resolve_principal
+from idempotency import IdempotencyInProgress, IdempotencyMismatch, IdempotencyStore
+from rate_limiter import RateLimiter
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for header_name, value in scope.get("headers", []):
+        if header_name == name:
+            return value.decode("latin-1")
+    return None
+
+def _bearer_token(scope) -> Optional[str]:
+    value = _header(scope, b"authorization")
+    if value:
+        scheme, _, credentials = value.partition(" ")
+        if scheme.lower() == "bearer" and credentials:
+            return credentials.strip()
+    return None
+
+async def _send_error(send, status: int, code: str, message: str, headers: List[Tuple[bytes, bytes]] = ()):
+    body = json.dumps({"detail": {"error": {"code": code, "message": message}}}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class RateLimitMiddleware:
+    """ASGI middleware that rate limits /api requests before routing
+
+    Requests are keyed on the bearer token's subject, or on the client IP when
+    there is no valid token, so a flood is rejected before any dependency
+    runs or the database is touched. The token is resolved through the
+    principal cache that get_current_user reads afterwards.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, operations: List[Tuple[str, str, str]] = (), prefix: str = "/api"):
+        self.app = app
+        self.limiter = limiter
+        self.prefix = prefix
+        # (method, path regex, operation) used to pick the cost weight
+        self.operations = [(method, re.compile(pattern), operation) for method, pattern, operation in operations]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        key = self._rate_limit_key(scope)
+        operation = self._operation(scope["method"], scope["path"])
+
+        if self.limiter.allow_operation(key, operation):
+            await self.app(scope, receive, send)
+            return
+
+        await _send_error(
+            send, 429, "RATE_LIMIT", "Rate limit exceeded",
+            [(b"retry-after", str(self.limiter.retry_after()).encode("latin-1"))]
+        )
+
+    def _rate_limit_key(self, scope) -> str:
+        token = _bearer_token(scope)
+        if token:
+            principal = resolve_principal(token)
+            if principal is not None:
+                return str(principal.id)
+
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    def _operation(self, method: str, path: str) -> str:
+        for op_method, pattern, operation in self.operations:
+            if op_method == method and pattern.match(path):
+                return operation
+        return "default"
+
+class IdempotencyMiddleware:
+    """ASGI middleware that makes POST /api requests with an Idempotency-Key safe to retry
+
+    The key is scoped to the token's subject and bound to a fingerprint of
+    the method, path and body. A retry replays the stored 2xx response
+    without running the handler, a duplicate arriving while the first
+    request runs waits for it, and reusing the key for a different request
+    is rejected with 422. Requests without a valid token pass through and
+    get their 401 from the handler.
+    """
+
+    def __init__(self, app, store: IdempotencyStore, prefix: str = "/api", max_key_length: int = 255):
+        self.app = app
+        self.store = store
+        self.prefix = prefix
+        self.max_key_length = max_key_length
+
+    async def __call__(self, scope, receive, send):
+        key = None
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"].startswith(self.prefix):
+            key = _header(scope, b"idempotency-key")
+        token = _bearer_token(scope) if key else None
+        principal = resolve_principal(token) if token else None
+        if principal is None:
+            await self.app(scope, receive, send)
+            return
+
+        if len(key) > self.max_key_length:
+            await _send_error(
+                send, 400, "INVALID_IDEMPOTENCY_KEY",
+                f"Idempotency-Key must be at most {self.max_key_length} characters"
+            )
+            return
+
+        body = await self._read_body(receive)
+        try:
+            record = await self.store.acquire(principal.id, key, self._fingerprint(scope, body))
+        except IdempotencyMismatch:
+            await _send_error(
+                send, 422, "IDEMPOTENCY_KEY_REUSED", "Idempotency-Key was already used for a different request"
+            )
+            return
+        except IdempotencyInProgress:
+            await _send_error(
+                send, 409, "IDEMPOTENCY_IN_PROGRESS", "A request with this Idempotency-Key is still in progress",
+                [(b"retry-after", b"1")]
+            )
+            return
+
+        if record is not None:
+            await self._replay(send, record)
+            return
+
+        response = {"status": None, "content_type": None, "body": []}
+
+        async def replay_receive():
+            nonlocal body
+            if body is not None:
+                message = {"type": "http.request", "body": body, "more_body": False}
+                body = None
+                return message
+            return await receive()
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        response["content_type"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        completed = False
+        try:
+            await self.app(scope, replay_receive, capture)
+            # Only successes are kept; errors leave the key free for a retry
+            if response["status"] is not None and 200 <= response["status"] < 300:
+                await self.store.complete(
+                    principal.id, key, response["status"], response["content_type"], b"".join(response["body"])
+                )
+                completed = True
+        finally:
+            if not completed:
+                await self.store.release(principal.id, key)
+
+    async def _read_body(self, receive) -> bytes:
+        """Buffer the request body so it can be fingerprinted and then handed on"""
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    def _fingerprint(self, scope, body: bytes) -> str:
+        digest = hashlib.sha256()
+        digest.update(scope["method"].encode("latin-1") + b" " + scope["path"].encode("utf-8") + b"?")
+        digest.update(scope.get("query_string", b"") + b"\n")
+        # Multipart boundaries are random per attempt, so they are left out
+        content_type = _header(scope, b"content-type") or ""
+        boundary = re.search(r"boundary=\"?([^\";]+)", content_type)
+        if boundary:
+            body = body.replace(boundary.group(1).encode("latin-1"), b"")
+        digest.update(body)
+        return digest.hexdigest()
+
+    async def _replay(self, send, record):
+        body = record.response_body or b""
+        headers = [
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"idempotent-replayed", b"true"),
+        ]
+        if record.response_content_type:
+            headers.append((b"content-type", record.response_content_type.encode("latin-1")))
+        await send({"type": "http.response.start", "status": record.response_status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Apply pending schema migrations to the configured database
+"""
+import argparse
+from datetime import datetime
+from typing import Callable, List, Sequence, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, bindparam, inspect, literal, or_, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from database import Base, engine
+import models  # noqa: F401  (registers the tables on Base.metadata)
+from pii_redactor import PIIRedactor
+
+# Bookkeeping table, kept off Base.metadata so create_all never touches it
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+BACKFILL_BATCH_SIZE = 500
+
+def _create_tables(*names: str) -> Callable[[Connection], None]:
+    """Step creating the named tables, with their indexes, if they do not exist
+    
+    A table is created with its current model definition; later column steps
+    then find their columns present and skip them.
+    """
+    def step(conn: Connection):
+        tables = [Base.metadata.tables[name] for name in names]
+        Base.metadata.create_all(bind=conn, tables=tables, checkfirst=True)
+    return step
+
+def _add_columns(**columns: Sequence[str]) -> Callable[[Connection], None]:
+    """Step adding the named model columns, given per table, to existing tables
+    
+    Columns with a scalar default get it as a server default so existing
+    rows are backfilled and NOT NULL can be kept; others are added nullable.
+    """
+    def step(conn: Connection):
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+        for table_name, names in columns.items():
+            if table_name not in existing_tables:
+                continue
+            table = Base.metadata.tables[table_name]
+            existing_columns = {column["name"] for column in inspector.get_columns(table_name)}
+            for name in names:
+                if name in existing_columns:
+                    continue
+                
+                column = table.columns[name]
+                ddl = f"ALTER TABLE {table_name} ADD COLUMN {name} {column.type.compile(dialect=conn.dialect)}"
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if default is not None:
+                    ddl += " DEFAULT " + str(literal(default).compile(
+                        dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+                    ))
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                conn.execute(text(ddl))
+    return step
+
+def _create_indexes(*names: str) -> Callable[[Connection], None]:
+    """Step creating the named model indexes that are missing"""
+    def step(conn: Connection):
+        indexes = {index.name: index for table in Base.metadata.sorted_tables for index in table.indexes}
+        for name in names:
+            indexes[name].create(bind=conn, checkfirst=True)
+    return step
+
+def _add_enum_values(table_name: str, column_name: str) -> Callable[[Connection], None]:
+    """Step adding the model's enum labels missing from a native PostgreSQL enum
+    
+    Other dialects store the column as a plain string, so there is nothing
+    to alter. ADD VALUE runs inside the step's transaction (PostgreSQL 12+);
+    the new label is only used after the step commits.
+    """
+    def step(conn: Connection):
+        if conn.dialect.name != "postgresql":
+            return
+        enum_type = Base.metadata.tables[table_name].columns[column_name].type
+        for label in enum_type.enums:
+            conn.execute(text(f"ALTER TYPE {enum_type.name} ADD VALUE IF NOT EXISTS '{label}'"))
+    return step
+
+def _backfill_resume_previews(conn: Connection):
+    """Compute the preview and PII spans of resumes where missing or stale
+    
+    A row is stale when its spans were computed with an older pattern set;
+    the preview is redacted with the same patterns, so both are rebuilt.
+    Rows are read in id order a batch at a time and each batch is committed,
+    so neither the corpus nor the pending updates are held in memory and a
+    long backfill does not run as one transaction.
+    """
+    resumes = Base.metadata.tables["resumes"]
+    redactor = PIIRedactor()
+    update = resumes.update().where(resumes.c.id == bindparam("resume_id")).values(
+        preview=bindparam("preview"), pii_spans=bindparam("pii_spans"), pii_version=bindparam("pii_version")
+    )
+    stale = or_(
+        resumes.c.preview.is_(None),
+        resumes.c.pii_version.is_(None),
+        resumes.c.pii_version != redactor.version
+    )
+    
+    last_id = None
+    while True:
+        query = select(resumes.c.id, resumes.c.content).where(stale).order_by(resumes.c.id).limit(BACKFILL_BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(resumes.c.id > last_id)
+        rows = conn.execute(query).all()
+        if not rows:
+            return
+        
+        conn.execute(update, [
+            {"resume_id": resume_id, **redactor.ingest_columns(content or "")}
+            for resume_id, content in rows
+        ])
+        conn.commit()
+        last_id = rows[-1][0]
+
+# Ordered (version, step) pairs. Each step names the tables, columns or
+# indexes it introduces rather than diffing against the current models, so
+# replaying an old version never applies schema from a later one. Steps must
+# be idempotent: a table created by an earlier step already has the columns
+# later steps would add. Append new versions here rather than editing
+# applied ones.
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_create_tables", _create_tables("users", "resumes", "jobs", "resume_embeddings", "resume_fields")),
+    ("0002_ingest_columns", _add_columns(
+        resumes=("content_hash", "years_experience", "pii_spans", "pii_version"),
+        resume_embeddings=("section",),
+    )),
+    ("0003_lookup_indexes", _create_indexes(
+        "ix_resumes_user_id_created_at",
+        "ix_resumes_user_id_idempotency_key",
+        "ix_resumes_content_hash",
+        "ix_resumes_years_experience",
+        "ix_jobs_user_id_created_at",
+        "ix_jobs_user_id_idempotency_key",
+        "ix_resume_embeddings_resume_id",
+        "ix_resume_embeddings_section",
+    )),
+    ("0004_resume_preview", _add_columns(resumes=("preview",))),
+    ("0005_backfill_resume_previews", _backfill_resume_previews),
+    ("0006_idempotency_records", _create_tables("idempotency_records")),
+    ("0007_chunk_offsets", _add_columns(resume_embeddings=("start_offset", "end_offset"))),
+    ("0008_resume_text_hash", _add_columns(resumes=("text_hash",))),
+    ("0009_resume_text_hash_index", _create_indexes("ix_resumes_text_hash")),
+    ("0010_user_role_admin", _add_enum_values("users", "role")),
+]
+
+def applied_versions(conn: Connection) -> List[str]:
+    schema_migrations.create(bind=conn, checkfirst=True)
+    return [row[0] for row in conn.execute(schema_migrations.select().order_by(schema_migrations.c.version))]
+
+def migrate(db_engine: Engine = engine) -> List[str]:
+    """Apply pending migrations, committing each with its version row"""
+    applied = []
+    with db_engine.connect() as conn:
+        done = set(applied_versions(conn))
+        conn.commit()
+        for version, step in MIGRATIONS:
+            if version in done:
+                continue
+            step(conn)
+            conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.utcnow()))
+            conn.commit()
+            applied.append(version)
+    return applied
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--status", action="store_true", help="List applied and pending versions only")
+    parser.add_argument(
+        "--refresh-pii", action="store_true",
+        help="Rebuild stored PII spans and previews after PII_PATTERN_VERSION changes"
+    )
+    args = parser.parse_args()
+    
+    if args.refresh_pii:
+        with engine.connect() as conn:
+            _backfill_resume_previews(conn)
+        print("PII spans and previews are current")
+        return
+    
+    if args.status:
+        with engine.begin() as conn:
+            done = set(applied_versions(conn))
+        for version, _ in MIGRATIONS:
+            print(f"{'applied' if version in done else 'pending'}  {version}")
+        return
+    
+    applied = migrate()
+    if applied:
+        for version in applied:
+            print(f"Applied {version}")
+    else:
+        print("Database is up to date")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,17 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Float, Integer, Enum
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Float, Integer, Enum, Index, LargeBinary
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
 import enum
 
-Base = declarative_base()
+from database import Base
+from compression import CompressedText
 
 class UserRole(str, enum.Enum):
     RECRUITER = "recruiter"
     CANDIDATE = "candidate"
+    ADMIN = "admin"
 
 class User(Base):
     __tablename__ = "users"
@@ -28,10 +29,21 @@ class User(Base):
 
 class Resume(Base):
     __tablename__ = "resumes"
+    __table_args__ = (
+        Index("ix_resumes_user_id_created_at", "user_id", "created_at"),
+        Index("ix_resumes_user_id_idempotency_key", "user_id", "idempotency_key"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     filename = Column(String, nullable=False)
-    content = Column(Text, nullable=False)
+    # Deferred: listings read the preview, only detail views load the body
+    content = deferred(Column(CompressedText, nullable=False))
+    preview = Column(Text, nullable=True)  # redacted leading excerpt, safe for any role
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 of uploaded bytes
+    text_hash = Column(String(64), nullable=True, index=True)  # sha256 of the parsed text
+    years_experience = Column(Float, nullable=True, index=True)
+    pii_spans = Column(Text, nullable=True)  # JSON [[start, end, type], ...] detected at ingest
+    pii_version = Column(String(16), nullable=True)  # pattern set the spans were computed with
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     idempotency_key = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -39,9 +51,29 @@ class Resume(Base):
     # Relationships
     user = relationship("User", back_populates="resumes")
     embeddings = relationship("ResumeEmbedding", back_populates="resume")
+    fields = relationship("ResumeField", back_populates="resume")
+
+class ResumeField(Base):
+    """Structured values (skills, titles, degrees) extracted at ingest for SQL pre-filtering"""
+    __tablename__ = "resume_fields"
+    __table_args__ = (
+        Index("ix_resume_fields_kind_value", "kind", "value"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    resume_id = Column(UUID(as_uuid=True), ForeignKey("resumes.id"), nullable=False, index=True)
+    kind = Column(String, nullable=False)  # skill | title | degree
+    value = Column(String, nullable=False)
+    
+    # Relationships
+    resume = relationship("Resume", back_populates="fields")
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_user_id_created_at", "user_id", "created_at"),
+        Index("ix_jobs_user_id_idempotency_key", "user_id", "idempotency_key"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String, nullable=False)
@@ -58,11 +90,29 @@ class ResumeEmbedding(Base):
     __tablename__ = "resume_embeddings"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    resume_id = Column(UUID(as_uuid=True), ForeignKey("resumes.id"), nullable=False)
-    chunk_text = Column(Text, nullable=False)
+    resume_id = Column(UUID(as_uuid=True), ForeignKey("resumes.id"), nullable=False, index=True)
+    chunk_text = Column(Text, nullable=False, default="")  # only rows written before offsets existed
+    # Span of the chunk in the resume's whitespace-normalised content
+    start_offset = Column(Integer, nullable=True)
+    end_offset = Column(Integer, nullable=True)
+    section = Column(String, nullable=False, default="general", index=True)
     embedding = Column(Text, nullable=False)  # JSON string of embedding vector
     chunk_index = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     resume = relationship("Resume", back_populates="embeddings")
+
+class IdempotencyRecord(Base):
+    """Outcome of a POST made with an Idempotency-Key, replayed to retries until it expires"""
+    __tablename__ = "idempotency_records"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of method, path and body
+    status = Column(String(16), nullable=False)  # in_flight | completed
+    response_status = Column(Integer, nullable=True)
+    response_content_type = Column(String, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,72 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    """Opaque cursor for the (created_at, id) position of the last row on a page"""
+    payload = json.dumps({"c": created_at.isoformat(), "i": row_id.hex}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["c"]), uuid.UUID(hex=payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+
+async def keyset_page(
+    db: AsyncSession, query, model, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page of ``query`` newest first, seeking past ``cursor``
+    
+    ``model`` must have ``created_at`` and ``id`` columns. The seek is a
+    range condition on (created_at, id), so with an index on
+    (owner, created_at) every page costs the same regardless of depth.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+    
+    # One extra row tells whether another page exists without a count
+    rows = (await db.scalars(
+        query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+    )).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+async def offset_page(
+    db: AsyncSession, query, model, limit: int, offset: int
+) -> Tuple[List[Any], Optional[int], Optional[str]]:
+    """Offset pagination in the same order as keyset_page, kept for existing clients
+    
+    Also returns the cursor for the next page so clients can switch to
+    seeking after the first request.
+    """
+    rows = (await db.scalars(
+        query.order_by(model.created_at.desc(), model.id.desc()).offset(offset).limit(limit + 1)
+    )).all()
+    
+    if len(rows) <= limit:
+        return rows, None, None
+    rows = rows[:limit]
+    return rows, offset + limit, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+async def count_rows(db: AsyncSession, query) -> int:
+    """Total rows matched by ``query``; a full scan of the matching set"""
+    return await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
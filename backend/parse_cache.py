@@ -0,0 +1,73 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+def content_hash(content: bytes) -> str:
+    """Return the sha256 hex digest used to address parsed documents"""
+    return hashlib.sha256(content).hexdigest()
+
+class ParseCache:
+    """Size-bounded LRU cache of parse results keyed by file content hash"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for key, marking it as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        """Store an entry, evicting least recently used entries to stay in bounds"""
+        size = self._entry_size(entry)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+
+            self._entries[key] = entry
+            self._sizes[key] = size
+            self._total_bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+            ):
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(evicted_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _entry_size(self, entry: Dict[str, Any]) -> int:
+        """Approximate memory footprint of an entry by its text payload"""
+        size = len(entry.get('text', ''))
+        for _, section_text in entry.get('sections') or []:
+            size += len(section_text)
+        return size
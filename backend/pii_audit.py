@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Corpus-wide PII audit: report which stored resumes contain given PII types
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from database import SessionLocal
+from models import Resume
+from pii_redactor import PII_PATTERNS, compile_pii_regex
+
+AUDIT_TYPES = ('ssn', 'credit_card', 'date_of_birth')
+
+@lru_cache(maxsize=8)
+def _audit_regex(pii_types: Tuple[str, ...]):
+    """Compile an engine restricted to the audited types, once per worker process"""
+    return compile_pii_regex({pii_type: PII_PATTERNS[pii_type] for pii_type in pii_types})
+
+def _scan_batch(batch: List[Tuple[str, str]], pii_types: Tuple[str, ...]) -> Dict[str, List[str]]:
+    """Return resume ids per PII type for one batch; runs inside a worker process"""
+    regex = _audit_regex(pii_types)
+    found = {pii_type: [] for pii_type in pii_types}
+    
+    for resume_id, content in batch:
+        seen = set()
+        for match in regex.finditer(content or ''):
+            if match.lastgroup not in seen:
+                seen.add(match.lastgroup)
+                found[match.lastgroup].append(resume_id)
+                if len(seen) == len(pii_types):
+                    break
+    
+    return found
+
+def _batches(rows: Iterable[Tuple[Any, str]], batch_size: int) -> Iterator[List[Tuple[str, str]]]:
+    batch = []
+    for resume_id, content in rows:
+        batch.append((str(resume_id), content))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def run_audit(
+    pii_types: Sequence[str] = AUDIT_TYPES,
+    workers: Optional[int] = None,
+    batch_size: int = 200,
+    session_factory=SessionLocal
+) -> Dict[str, Any]:
+    """Scan every Resume.content in parallel worker processes
+    
+    Rows are read through a streaming cursor in batches and at most two
+    batches per worker are in flight, so memory use does not grow with the
+    size of the corpus.
+    """
+    pii_types = tuple(pii_types)
+    unknown = [pii_type for pii_type in pii_types if pii_type not in PII_PATTERNS]
+    if unknown:
+        raise ValueError(f"Unknown PII types: {', '.join(unknown)}")
+    
+    workers = workers or os.cpu_count() or 1
+    resume_ids = {pii_type: [] for pii_type in pii_types}
+    documents = 0
+    started = time.perf_counter()
+    
+    def collect(futures):
+        for future in futures:
+            for pii_type, ids in future.result().items():
+                resume_ids[pii_type].extend(ids)
+    
+    db = session_factory()
+    try:
+        rows = db.query(Resume.id, Resume.content).execution_options(
+            stream_results=True
+        ).yield_per(batch_size)
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for batch in _batches(rows, batch_size):
+                documents += len(batch)
+                pending.add(executor.submit(_scan_batch, batch, pii_types))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(pending)
+    finally:
+        db.close()
+    
+    elapsed = time.perf_counter() - started
+    return {
+        'documents': documents,
+        'seconds': round(elapsed, 3),
+        'documents_per_second': round(documents / elapsed, 1) if elapsed > 0 else 0.0,
+        'counts': {pii_type: len(ids) for pii_type, ids in resume_ids.items()},
+        'resume_ids': resume_ids
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--types", nargs="+", default=list(AUDIT_TYPES), choices=list(PII_PATTERNS))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+    
+    report = run_audit(args.types, args.workers, args.batch_size)
+    
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    
+    print(f"Scanned {report['documents']} resumes in {report['seconds']}s "
+          f"({report['documents_per_second']} documents/s)")
+    for pii_type, count in report['counts'].items():
+        print(f"  {pii_type}: {count} resume(s)")
+
+if __name__ == "__main__":
+    main()
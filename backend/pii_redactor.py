@@ -1,54 +1,210 @@
+import hashlib
+import json
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterable, Iterator, Sequence, Tuple
+
+# Ordered from most to least specific: when two patterns match at the same
+# position the first alternative wins (e.g. a card number is not a phone).
+PII_PATTERNS = {
+    'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    'credit_card': r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',
+    'ssn': r'\b\d{3}-?\d{2}-?\d{4}\b',
+    'date_of_birth': r'\b(?:0[1-9]|1[0-2])[-\/](?:0[1-9]|[12][0-9]|3[01])[-\/](?:19|20)\d{2}\b',
+    'phone': r'\b(?:\+?1[-.\s]?)?\(?(?:[0-9]{3})\)?[-.\s]?(?:[0-9]{3})[-.\s]?(?:[0-9]{4})\b',
+    # House number plus up to eight words of street name, which may be split
+    # by commas or line breaks ("42 Old Mill, Springfield Road"). The bound
+    # keeps the scan linear; an unbounded [A-Za-z0-9\s,.-]+ here used to run
+    # to the last word ending in "st"/"rd" and dominated the cost of every scan.
+    'address': r'\b\d{1,6}\s+(?:[A-Za-z0-9.\'-]+(?:,\s*|\s+)){1,8}(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Lane|Ln|Boulevard|Blvd)\b'
+}
+
+REPLACEMENT_MAP = {
+    'email': '[EMAIL REDACTED]',
+    'phone': '[PHONE REDACTED]',
+    'ssn': '[SSN REDACTED]',
+    'address': '[ADDRESS REDACTED]',
+    'credit_card': '[CARD REDACTED]',
+    'date_of_birth': '[DOB REDACTED]'
+}
+
+def compile_pii_regex(patterns: Dict[str, str]) -> re.Pattern:
+    """Fold the patterns into one alternation with a named group per PII type
+    
+    Every pattern starts with a word boundary, so the boundary is tested once
+    up front and the digit-led patterns sit behind a single lookahead. Without
+    that factoring the combined scan is no faster than six separate passes.
+    """
+    alternatives = []
+    numeric = []
+    for pii_type, pattern in patterns.items():
+        if not pattern.startswith(r'\b'):
+            raise ValueError(f"PII pattern '{pii_type}' must start with a word boundary")
+        group = f'(?P<{pii_type}>{pattern[2:]})'
+        (alternatives if pii_type == 'email' else numeric).append(group)
+    
+    if numeric:
+        alternatives.append(r'(?=[\d(+])(?:' + '|'.join(numeric) + ')')
+    
+    return re.compile(r'\b(?:' + '|'.join(alternatives) + ')', re.IGNORECASE)
+
+# Scanned once per document by redact, detect_pii and is_pii_present
+PII_REGEX = compile_pii_regex(PII_PATTERNS)
+
+# Identifies the pattern set that produced stored spans; any edit to the
+# patterns changes it, so spans persisted under an older set get recomputed
+PII_PATTERN_VERSION = hashlib.sha256(PII_REGEX.pattern.encode('utf-8')).hexdigest()[:16]
+
+def iter_chunks(text: str, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """Slice text into fixed-size chunks for streaming"""
+    for start in range(0, len(text), chunk_size):
+        yield text[start:start + chunk_size]
 
 class PIIRedactor:
     def __init__(self):
-        self.pii_patterns = {
-            'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            'phone': r'\b(?:\+?1[-.\s]?)?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})\b',
-            'ssn': r'\b\d{3}-?\d{2}-?\d{4}\b',
-            'address': r'\b\d+\s+[A-Za-z0-9\s,.-]+(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Lane|Ln|Boulevard|Blvd)\b',
-            'credit_card': r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',
-            'date_of_birth': r'\b(?:0[1-9]|1[0-2])[-\/](?:0[1-9]|[12][0-9]|3[01])[-\/](?:19|20)\d{2}\b'
-        }
-        
-        self.replacement_map = {
-            'email': '[EMAIL REDACTED]',
-            'phone': '[PHONE REDACTED]',
-            'ssn': '[SSN REDACTED]',
-            'address': '[ADDRESS REDACTED]',
-            'credit_card': '[CARD REDACTED]',
-            'date_of_birth': '[DOB REDACTED]'
-        }
+        self.pii_patterns = PII_PATTERNS
+        self.replacement_map = REPLACEMENT_MAP
+        self.version = PII_PATTERN_VERSION
+    
+    def scan(self, text: str) -> Iterator[Tuple[str, int, int]]:
+        """Yield (pii_type, start, end) for each non-overlapping PII match, left to right"""
+        for match in PII_REGEX.finditer(text):
+            yield match.lastgroup, match.start(), match.end()
     
     def redact(self, text: str) -> str:
         """Redact PII from text"""
-        redacted_text = text
+        return self.apply_spans(text, ((start, end, pii_type) for pii_type, start, end in self.scan(text)))
+    
+    def find_spans(self, text: str) -> List[List[Any]]:
+        """Return [start, end, pii_type] spans in a JSON-serialisable form for storage"""
+        return [[start, end, pii_type] for pii_type, start, end in self.scan(text)]
+    
+    def apply_spans(self, text: str, spans: Iterable[Sequence[Any]]) -> str:
+        """Replace (start, end, pii_type) spans, in ascending order, with their markers"""
+        pieces = []
+        position = 0
+        
+        for start, end, pii_type in spans:
+            pieces.append(text[position:start])
+            pieces.append(self.replacement_map[pii_type])
+            position = end
+        
+        if not pieces:
+            return text
+        
+        pieces.append(text[position:])
+        return ''.join(pieces)
+    
+    def stream_spans(
+        self, text: str, spans: Iterable[Sequence[Any]], chunk_size: int = 64 * 1024
+    ) -> Iterator[str]:
+        """Like apply_spans, but yield the redacted text in pieces of about chunk_size"""
+        def segments():
+            position = 0
+            for start, end, pii_type in spans:
+                yield text[position:start]
+                yield self.replacement_map[pii_type]
+                position = end
+            yield text[position:]
+        
+        pending = []
+        size = 0
+        for segment in segments():
+            for piece in iter_chunks(segment, chunk_size):
+                pending.append(piece)
+                size += len(piece)
+                if size >= chunk_size:
+                    yield ''.join(pending)
+                    pending = []
+                    size = 0
+        if pending:
+            yield ''.join(pending)
+    
+    def redact_stream(self, chunks: Iterable[str], overlap: int = 1024) -> Iterator[str]:
+        """Redact an iterable of text chunks, yielding redacted text incrementally
         
-        for pii_type, pattern in self.pii_patterns.items():
-            redacted_text = re.sub(
-                pattern, 
-                self.replacement_map[pii_type], 
-                redacted_text, 
-                flags=re.IGNORECASE
-            )
+        The tail of the buffer (``overlap`` characters) is held back and
+        rescanned with the next chunk, so any match shorter than ``overlap``
+        is caught even when it straddles a chunk boundary. Memory stays
+        bounded by the chunk size plus the overlap.
+        """
+        buffer = ''
+        context = 0  # leading characters kept only so \b sees what came before
         
-        return redacted_text
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) - context < 2 * overlap:
+                continue
+            
+            safe = len(buffer) - overlap
+            pieces = []
+            position = context
+            
+            for pii_type, start, end in self._scan_from(buffer, context):
+                if end > safe:
+                    # The match may still grow with the next chunk, hold it back
+                    safe = min(safe, start)
+                    break
+                pieces.append(buffer[position:start])
+                pieces.append(self.replacement_map[pii_type])
+                position = end
+            
+            emit_to = max(position, safe)
+            pieces.append(buffer[position:emit_to])
+            yield ''.join(pieces)
+            
+            context = 1 if emit_to > 0 else 0
+            buffer = buffer[emit_to - context:]
+        
+        pieces = []
+        position = context
+        for pii_type, start, end in self._scan_from(buffer, context):
+            pieces.append(buffer[position:start])
+            pieces.append(self.replacement_map[pii_type])
+            position = end
+        pieces.append(buffer[position:])
+        tail = ''.join(pieces)
+        if tail:
+            yield tail
+    
+    def ingest_columns(self, text: str) -> Dict[str, str]:
+        """Values stored with a resume and tied to the pattern version: spans and preview"""
+        return {
+            "pii_spans": json.dumps(self.find_spans(text)),
+            "pii_version": self.version,
+            "preview": self.preview(text)
+        }
+    
+    def preview(self, text: str, length: int = 280) -> str:
+        """Redacted leading excerpt of text, scanning little more than it returns"""
+        pieces = []
+        size = 0
+        for piece in self.redact_stream(iter_chunks(text, 4 * 1024)):
+            pieces.append(piece)
+            size += len(piece)
+            if size > length:
+                break
+        
+        excerpt = ''.join(pieces)
+        if len(excerpt) <= length:
+            return excerpt
+        # Cut on a word boundary when there is one
+        cut = excerpt[:length]
+        return (cut.rsplit(None, 1)[0] if ' ' in cut else cut) + '...'
+    
+    def _scan_from(self, text: str, pos: int) -> Iterator[Tuple[str, int, int]]:
+        """Like scan, but starting at pos while still letting \b look at text[pos - 1]"""
+        for match in PII_REGEX.finditer(text, pos):
+            yield match.lastgroup, match.start(), match.end()
     
     def detect_pii(self, text: str) -> Dict[str, List[str]]:
         """Detect PII in text without redacting"""
         detected_pii = {}
         
-        for pii_type, pattern in self.pii_patterns.items():
-            matches = re.findall(pattern, text, flags=re.IGNORECASE)
-            if matches:
-                detected_pii[pii_type] = matches
+        for pii_type, start, end in self.scan(text):
+            detected_pii.setdefault(pii_type, []).append(text[start:end])
         
         return detected_pii
     
     def is_pii_present(self, text: str) -> bool:
         """Check if any PII is present in text"""
-        for pattern in self.pii_patterns.values():
-            if re.search(pattern, text, flags=re.IGNORECASE):
-                return True
-        return False
+        return PII_REGEX.search(text) is not None
@@ -1,66 +1,298 @@
+import math
 import time
-from typing import Dict
+import threading
+from typing import Dict, List, Optional, Tuple
 import redis
-import os
+
+from config import settings
+
+DEFAULT_BUCKET = "default"
+EXPENSIVE_BUCKET = "expensive"
+
+# Sliding-window counters for one or more buckets, evaluated atomically on
+# the Redis server: every bucket is checked before any is charged.
+# KEYS = (current window counter, previous window counter) per bucket
+# ARGV[1] = elapsed fraction of the current window, ARGV[2] = ttl, then (limit, cost) per bucket
+SLIDING_WINDOW_SCRIPT = """
+local elapsed = tonumber(ARGV[1])
+for i = 1, #KEYS / 2 do
+    local current = tonumber(redis.call('GET', KEYS[2 * i - 1]) or '0')
+    local previous = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+    if previous * (1 - elapsed) + current + tonumber(ARGV[2 * i + 2]) > tonumber(ARGV[2 * i + 1]) then
+        return 0
+    end
+end
+for i = 1, #KEYS / 2 do
+    redis.call('INCRBY', KEYS[2 * i - 1], ARGV[2 * i + 2])
+    redis.call('EXPIRE', KEYS[2 * i - 1], ARGV[2])
+end
+return 1
+"""
+
+# Reconciliation for hybrid mode: add the usage a worker spent from its
+# local lease and return how much of the global budget is left.
+# KEYS as above; ARGV[1] = consumed, ARGV[2] = limit, ARGV[3] = elapsed fraction, ARGV[4] = ttl
+RECONCILE_SCRIPT = """
+local current = redis.call('INCRBY', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+return math.floor(tonumber(ARGV[2]) - previous * (1 - tonumber(ARGV[3])) - current)
+"""
 
 class RateLimiter:
-    def __init__(self):
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
         # Use Redis if available, otherwise use in-memory storage
-        redis_url = os.getenv("REDIS_URL")
-        if redis_url:
-            self.redis_client = redis.from_url(redis_url)
-            self.use_redis = True
-        else:
-            self.redis_client = None
-            self.use_redis = False
-            self.requests: Dict[str, list] = {}
-        
-        self.rate_limit = 60  # 60 requests per minute
+        if redis_client is None and settings.redis_url:
+            pool = redis.ConnectionPool.from_url(
+                settings.redis_url,
+                max_connections=settings.redis_max_connections,
+                socket_timeout=settings.redis_socket_timeout,
+                socket_connect_timeout=settings.redis_socket_timeout
+            )
+            redis_client = redis.Redis(connection_pool=pool)
+        
+        self.redis_client = redis_client
+        self.use_redis = redis_client is not None
+        if self.use_redis:
+            self._sliding_window = self.redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+            self._reconcile_script = self.redis_client.register_script(RECONCILE_SCRIPT)
+        
+        # "redis" checks every request against Redis; "hybrid" spends local
+        # leases and reconciles with Redis from a background thread
+        self.mode = settings.rate_limit_mode if self.use_redis else "memory"
+        self.lease_size = settings.rate_limit_lease_size
+        self.sync_interval = settings.rate_limit_sync_interval
+        # Hybrid leases: key -> [window_index, remaining_allowance, unsynced_consumed, limit, lease_size]
+        self.leases: Dict[str, List[int]] = {}
+        self._reconciler: Optional[threading.Thread] = None
+        
+        # After a Redis failure, limit locally until this time before retrying
+        self.redis_retry_after = 0.0
+        self.redis_backoff = 5.0
+        
+        self.rate_limit = settings.rate_limit_per_minute
         self.window_size = 60  # 1 minute window
+        
+        # Every request costs one unit of the default bucket; expensive
+        # operations are additionally charged their weight in units of a
+        # separate, smaller bucket
+        self.limits = {
+            DEFAULT_BUCKET: self.rate_limit,
+            EXPENSIVE_BUCKET: settings.rate_limit_expensive_per_minute
+        }
+        self.costs: Dict[str, int] = dict(settings.rate_limit_costs)
+        
+        # Sliding-window counters: key -> [window_start, previous_count, current_count]
+        self.windows: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self.eviction_interval = self.window_size
+        self._last_eviction = 0.0
+    
+    def allow_operation(self, user_id: str, operation: str = DEFAULT_BUCKET) -> bool:
+        """Charge one request plus the operation's weight in the expensive bucket
+        
+        Both buckets are checked before either is charged, so a request
+        rejected by the expensive bucket does not use up default budget.
+        """
+        charges = [(DEFAULT_BUCKET, 1)]
+        cost = self.costs.get(operation)
+        if cost:
+            charges.append((EXPENSIVE_BUCKET, cost))
+        return self._allow(user_id, charges)
     
-    def is_allowed(self, user_id: str) -> bool:
+    def is_allowed(self, user_id: str, cost: int = 1, bucket: str = DEFAULT_BUCKET) -> bool:
         """Check if user is within rate limit"""
+        return self._allow(user_id, [(bucket, cost)])
+    
+    def _allow(self, user_id: str, charges: List[Tuple[str, int]]) -> bool:
+        """Charge (bucket, cost) pairs all or nothing"""
         current_time = time.time()
+        checks = [
+            (user_id if bucket == DEFAULT_BUCKET else f"{bucket}:{user_id}", cost, self.limits[bucket])
+            for bucket, cost in charges
+        ]
         
-        if self.use_redis:
-            return self._check_redis_rate_limit(user_id, current_time)
-        else:
-            return self._check_memory_rate_limit(user_id, current_time)
+        if self.use_redis and current_time >= self.redis_retry_after:
+            if self.mode == "hybrid":
+                return self._check_hybrid_rate_limits(checks, current_time)
+            try:
+                return self._check_redis_rate_limits(checks, current_time)
+            except redis.RedisError:
+                # Redis is unreachable or slow: degrade to per-process limiting
+                self.redis_retry_after = current_time + self.redis_backoff
+        
+        return self._check_memory_rate_limits(checks, current_time)
     
-    def _check_redis_rate_limit(self, user_id: str, current_time: float) -> bool:
-        """Check rate limit using Redis"""
-        key = f"rate_limit:{user_id}"
+    def retry_after(self, current_time: Optional[float] = None) -> int:
+        """Whole seconds until the current window ends, for the Retry-After header"""
+        current_time = time.time() if current_time is None else current_time
+        return max(1, int(math.ceil(self.window_size - current_time % self.window_size)))
+    
+    def _check_redis_rate_limit(
+        self, key: str, current_time: float, cost: int = 1, limit: Optional[int] = None
+    ) -> bool:
+        return self._check_redis_rate_limits([(key, cost, limit or self.rate_limit)], current_time)
+    
+    def _check_redis_rate_limits(self, checks: List[Tuple[str, int, int]], current_time: float) -> bool:
+        """Check and charge (key, cost, limit) counters with a single atomic script call"""
+        window_index = int(current_time // self.window_size)
+        elapsed_fraction = (current_time % self.window_size) / self.window_size
         
-        # Remove old entries
-        self.redis_client.zremrangebyscore(key, 0, current_time - self.window_size)
+        keys = []
+        args = [elapsed_fraction, 2 * self.window_size]
+        for key, cost, limit in checks:
+            keys.extend(self._redis_keys(key, window_index))
+            args.extend([limit, cost])
+        return bool(self._sliding_window(keys=keys, args=args))
+    
+    def _redis_keys(self, key: str, window_index: int) -> List[str]:
+        # The hash tag is the user, not the bucket, so every counter of one
+        # user shares a slot on Redis Cluster and one script can check them all
+        bucket, _, user = key.partition(":")
+        if bucket not in self.limits:
+            bucket, user = DEFAULT_BUCKET, key
+        prefix = "rate_limit" if bucket == DEFAULT_BUCKET else f"rate_limit:{bucket}"
+        return [
+            f"{prefix}:{{{user}}}:{window_index}",
+            f"{prefix}:{{{user}}}:{window_index - 1}"
+        ]
+    
+    def _check_hybrid_rate_limit(
+        self, key: str, current_time: float, cost: int = 1, limit: Optional[int] = None
+    ) -> bool:
+        return self._check_hybrid_rate_limits([(key, cost, limit or self.rate_limit)], current_time)
+    
+    def _check_hybrid_rate_limits(self, checks: List[Tuple[str, int, int]], current_time: float) -> bool:
+        """Spend from locally leased allowances without touching Redis
         
-        # Count current requests
-        current_requests = self.redis_client.zcard(key)
+        A worker starts each window with an optimistic lease of lease_size
+        units (at least one request's cost) and the reconciler resizes it to
+        the remaining global budget. The global limit can be overshot by at
+        most one lease per worker.
+        """
+        self._ensure_reconciler()
+        window_index = int(current_time // self.window_size)
         
-        if current_requests >= self.rate_limit:
-            return False
+        with self._lock:
+            leases = []
+            for key, cost, limit in checks:
+                lease = self.leases.get(key)
+                if lease is None or lease[0] != window_index:
+                    unsynced = lease[2] if lease is not None else 0
+                    lease_size = max(self.lease_size, cost)
+                    lease = [window_index, lease_size, unsynced, limit, lease_size]
+                    self.leases[key] = lease
+                
+                if lease[1] < cost:
+                    return False
+                leases.append(lease)
+            
+            for lease, (_, cost, _) in zip(leases, checks):
+                lease[1] -= cost
+                lease[2] += cost
+            return True
+    
+    def reconcile(self, current_time: Optional[float] = None):
+        """Push locally consumed usage to Redis and refresh every lease in one round trip"""
+        current_time = time.time() if current_time is None else current_time
+        window_index = int(current_time // self.window_size)
+        elapsed_fraction = (current_time % self.window_size) / self.window_size
         
-        # Add current request
-        self.redis_client.zadd(key, {str(current_time): current_time})
-        self.redis_client.expire(key, self.window_size)
+        with self._lock:
+            # Forget leases that are idle and fully synced
+            for key in [k for k, lease in self.leases.items() if lease[0] < window_index - 1 and not lease[2]]:
+                del self.leases[key]
+            pending = {key: (lease[2], lease[3]) for key, lease in self.leases.items()}
         
-        return True
-    
-    def _check_memory_rate_limit(self, user_id: str, current_time: float) -> bool:
-        """Check rate limit using in-memory storage"""
-        if user_id not in self.requests:
-            self.requests[user_id] = []
+        if not pending:
+            return
         
-        # Remove old requests outside the window
-        self.requests[user_id] = [
-            req_time for req_time in self.requests[user_id]
-            if current_time - req_time < self.window_size
-        ]
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key, (consumed, limit) in pending.items():
+            self._reconcile_script(
+                keys=self._redis_keys(key, window_index),
+                args=[consumed, limit, elapsed_fraction, 2 * self.window_size],
+                client=pipe
+            )
+        remaining = pipe.execute()
+        
+        with self._lock:
+            for (key, (consumed, _)), global_remaining in zip(pending.items(), remaining):
+                lease = self.leases[key]
+                lease[2] -= consumed
+                if lease[0] < window_index:
+                    lease[0] = window_index
+                # Usage spent while the round trip was in flight comes out of the new lease
+                lease[1] = max(0, min(lease[4], int(global_remaining) - lease[2]))
+    
+    def _ensure_reconciler(self):
+        if self._reconciler is None or not self._reconciler.is_alive():
+            with self._lock:
+                if self._reconciler is None or not self._reconciler.is_alive():
+                    self._reconciler = threading.Thread(
+                        target=self._reconcile_loop, name="rate-limit-reconciler", daemon=True
+                    )
+                    self._reconciler.start()
+    
+    def _reconcile_loop(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.reconcile()
+            except redis.RedisError:
+                # Until Redis is back, is_allowed limits each process on its own
+                self.redis_retry_after = time.time() + self.redis_backoff
+    
+    def _check_memory_rate_limit(
+        self, key: str, current_time: float, cost: int = 1, limit: Optional[int] = None
+    ) -> bool:
+        return self._check_memory_rate_limits([(key, cost, limit or self.rate_limit)], current_time)
+    
+    def _check_memory_rate_limits(self, checks: List[Tuple[str, int, int]], current_time: float) -> bool:
+        """Check rate limits using an O(1) sliding-window counter per key
         
-        # Check if under rate limit
-        if len(self.requests[user_id]) >= self.rate_limit:
-            return False
+        The previous fixed window's count is weighted by how much of it still
+        overlaps the sliding window, which approximates a timestamp log with
+        three numbers per key. Every key is checked before any is charged.
+        """
+        with self._lock:
+            if current_time - self._last_eviction >= self.eviction_interval:
+                self._evict_idle(current_time)
+            
+            windows = []
+            for key, cost, limit in checks:
+                window = self.windows.get(key)
+                if window is None:
+                    window = [current_time - current_time % self.window_size, 0, 0]
+                    self.windows[key] = window
+                
+                self._roll_window(window, current_time)
+                
+                elapsed_fraction = (current_time - window[0]) / self.window_size
+                estimated = window[1] * (1 - elapsed_fraction) + window[2]
+                if estimated + cost > limit:
+                    return False
+                windows.append(window)
+            
+            for window, (_, cost, _) in zip(windows, checks):
+                window[2] += cost
+            return True
+    
+    def _roll_window(self, window: List[float], current_time: float):
+        """Advance a counter to the fixed window containing current_time"""
+        windows_passed = int((current_time - window[0]) // self.window_size)
+        if windows_passed <= 0:
+            return
         
-        # Add current request
-        self.requests[user_id].append(current_time)
-        return True
+        # The current count only carries over if exactly one window has passed
+        window[1] = window[2] if windows_passed == 1 else 0
+        window[2] = 0
+        window[0] += windows_passed * self.window_size
+    
+    def _evict_idle(self, current_time: float):
+        """Drop keys that have been idle long enough to hold no remaining weight"""
+        idle_before = current_time - 2 * self.window_size
+        idle_keys = [key for key, window in self.windows.items() if window[0] <= idle_before]
+        for key in idle_keys:
+            del self.windows[key]
+        self._last_eviction = current_time
@@ -1,13 +1,243 @@
 import io
+import multiprocessing
+import os
 import re
-from typing import Dict, Any
+import signal
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Optional, Set, Tuple
 import PyPDF2
 import docx2txt
 from docx import Document
 import zipfile
 
+from config import settings
+from parse_cache import ParseCache, content_hash
+
+GENERAL_SECTION = 'general'
+SECTION_NAMES = (
+    GENERAL_SECTION, 'experience', 'education', 'skills', 'summary', 'projects', 'certifications'
+)
+
+# Header grammar: a line holding only a known keyword, optionally after a
+# short qualifier ("Work Experience", "Key Skills") and optionally followed
+# by a colon with inline content, as in "Skills: Python, Go". Anything else
+# after the keyword makes it a body line ("Experience in building APIs").
+# A qualifier is only taken when a keyword follows it, so "Work History"
+# and a bare "Academic" still fall through to their own alternatives.
+SECTION_HEADER_QUALIFIERS = r'(?:work|professional|key|core|personal|relevant|technical|academic|selected)'
+SECTION_HEADER_PATTERN = re.compile(
+    r'^[ \t]*(?:' + SECTION_HEADER_QUALIFIERS + r'[ \t]+)?(?:'
+    r'(?P<experience>experience|work[ \t]+history|employment(?:[ \t]+history)?)'
+    r'|(?P<education>education|academic|qualifications)'
+    r'|(?P<skills>skills|competencies)'
+    r'|(?P<summary>summary|profile|objective|about(?:[ \t]+me)?)'
+    r'|(?P<projects>projects|portfolio)'
+    r'|(?P<certifications>certifications|certificates)'
+    r')[ \t]*(?::[^\n]*)?\r?$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Canonical skill -> aliases recognised in resume text
+SKILL_ALIASES = {
+    'python': ['python'],
+    'java': ['java'],
+    'javascript': ['javascript', 'js', 'ecmascript'],
+    'typescript': ['typescript'],
+    'go': ['golang'],
+    'rust': ['rust'],
+    'c++': ['c++', 'cpp'],
+    'c#': ['c#', 'csharp', '.net'],
+    'ruby': ['ruby', 'rails', 'ruby on rails'],
+    'php': ['php'],
+    'kotlin': ['kotlin'],
+    'swift': ['swift'],
+    'scala': ['scala'],
+    'sql': ['sql'],
+    'postgresql': ['postgresql', 'postgres'],
+    'mysql': ['mysql'],
+    'mongodb': ['mongodb', 'mongo'],
+    'redis': ['redis'],
+    'kafka': ['kafka'],
+    'spark': ['spark', 'pyspark'],
+    'react': ['react', 'react.js', 'reactjs'],
+    'angular': ['angular'],
+    'vue': ['vue', 'vue.js'],
+    'node.js': ['node.js', 'nodejs', 'node'],
+    'django': ['django'],
+    'flask': ['flask'],
+    'fastapi': ['fastapi'],
+    'aws': ['aws', 'amazon web services'],
+    'gcp': ['gcp', 'google cloud'],
+    'azure': ['azure'],
+    'docker': ['docker'],
+    'kubernetes': ['kubernetes', 'k8s'],
+    'terraform': ['terraform'],
+    'linux': ['linux'],
+    'git': ['git'],
+    'machine learning': ['machine learning', 'ml'],
+    'deep learning': ['deep learning'],
+    'pytorch': ['pytorch'],
+    'tensorflow': ['tensorflow'],
+    'pandas': ['pandas'],
+    'numpy': ['numpy'],
+}
+
+_SKILL_LOOKUP = {alias: skill for skill, aliases in SKILL_ALIASES.items() for alias in aliases}
+
+# Longest aliases first so "ruby on rails" wins over "ruby"; the lookarounds
+# stand in for \b, which does not work next to "+", "#" or ".".
+SKILL_PATTERN = re.compile(
+    r'(?<![\w+#.])(' + '|'.join(
+        re.escape(alias) for alias in sorted(_SKILL_LOOKUP, key=len, reverse=True)
+    ) + r')(?![\w+#]|\.\w)',
+    re.IGNORECASE
+)
+
+TITLE_PATTERN = re.compile(
+    r'\b(?:(?:senior|sr\.?|junior|jr\.?|lead|principal|staff|chief)\s+)?'
+    r'(software\s+engineer|software\s+developer|backend\s+engineer|frontend\s+engineer|'
+    r'full[\s-]?stack\s+(?:engineer|developer)|data\s+scientist|data\s+engineer|data\s+analyst|'
+    r'machine\s+learning\s+engineer|devops\s+engineer|site\s+reliability\s+engineer|'
+    r'product\s+manager|project\s+manager|engineering\s+manager|qa\s+engineer|'
+    r'solutions\s+architect|software\s+architect|designer)\b',
+    re.IGNORECASE
+)
+
+# Abbreviations are matched case-sensitively and bare two-letter forms need
+# their dots, so "200 ms", "MS Excel" or "ba" in running text are not degrees
+DEGREE_PATTERNS = {
+    'phd': re.compile(r'\b(?:ph\.?\s?d\.?|doctor(?:ate)?\s+of)', re.IGNORECASE),
+    'master': re.compile(r"\b(?:(?i:master(?:'?s)?)\b|M\.Sc?\.?(?!\w)|MSc\b|M\.?Eng\b|MBA\b|M\.?Tech\b)"),
+    'bachelor': re.compile(r"\b(?:(?i:bachelor(?:'?s)?)\b|B\.Sc?\.?(?!\w)|BSc\b|B\.A\.(?!\w)|B\.?Eng\b|B\.?Tech\b)"),
+    'associate': re.compile(r'\bassociate(?:\'?s)?\s+degree\b', re.IGNORECASE),
+}
+
+# "25 years old" is an age, not experience
+YEARS_PATTERN = re.compile(r'\b(\d{1,2}(?:\.\d)?)\+?\s*(?:years?|yrs?)\b(?![ \t-]*old\b)', re.IGNORECASE)
+
+DATE_RANGE_PATTERN = re.compile(
+    r'\b((?:19|20)\d{2})\s*(?:-|–|—|to)\s*((?:19|20)\d{2}|present|current|now)\b',
+    re.IGNORECASE
+)
+
+def canonical_skill(value: str) -> str:
+    """Map a skill or one of its aliases to the canonical name stored at ingest"""
+    value = value.strip().lower()
+    return _SKILL_LOOKUP.get(value, value)
+
+def canonical_title(value: str) -> str:
+    """Normalise a job title as stored at ingest, dropping seniority prefixes"""
+    match = TITLE_PATTERN.search(value)
+    return re.sub(r'[\s-]+', ' ', (match.group(1) if match else value).strip().lower())
+
+def canonical_degree(value: str) -> str:
+    """Map a degree name or abbreviation ("M.Sc", "Bachelor's") to its stored level"""
+    value = value.strip()
+    if value.lower() in DEGREE_PATTERNS:
+        return value.lower()
+    for degree, pattern in DEGREE_PATTERNS.items():
+        if pattern.search(value):
+            return degree
+    return value.lower()
+
+class ResumeParseError(Exception):
+    """Raised when a document cannot be turned into text"""
+    
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+def _report_pid(pids):
+    """Worker initializer: tell the parent which process to terminate later"""
+    pids.put(os.getpid())
+
+class _PdfPool:
+    """Worker processes shared by PDF extractions, retired when one times out
+    
+    Cancelling a future does not stop a page that is already being
+    extracted, and terminating a worker breaks the pool for every job using
+    it. So a timed-out job only retires the pool: new extractions get a fresh
+    one, and the retired workers are terminated once the other jobs' pages
+    are done. Workers report their pid on start, which is how they are found.
+    """
+    
+    def __init__(self, workers: int):
+        self._pids = multiprocessing.SimpleQueue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_report_pid, initargs=(self._pids,)
+        )
+        self._lock = threading.Lock()
+        self._live: Set[Future] = set()
+        self._retired = False
+        self._closed = False
+    
+    def submit(self, fn, *args) -> Future:
+        future = self.executor.submit(fn, *args)
+        with self._lock:
+            self._live.add(future)
+        future.add_done_callback(self._finished)
+        return future
+    
+    def abandon(self, futures: List[Future]):
+        """Give up on a timed-out job's futures and retire the pool"""
+        for future in futures:
+            future.cancel()
+        with self._lock:
+            self._live.difference_update(futures)
+            self._retired = True
+        self._close_if_idle()
+    
+    def _finished(self, future: Future):
+        with self._lock:
+            self._live.discard(future)
+        self._close_if_idle()
+    
+    def _close_if_idle(self):
+        with self._lock:
+            if not self._retired or self._live or self._closed:
+                return
+            self._closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        while not self._pids.empty():
+            try:
+                os.kill(self._pids.get(), signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+_pdf_pool: Optional[_PdfPool] = None
+_pdf_pool_lock = threading.Lock()
+
+def _get_pdf_pool() -> _PdfPool:
+    """Lazily create the worker pool shared by all PDF extractions"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = _PdfPool(settings.pdf_parse_workers)
+        return _pdf_pool
+
+def _retire_pdf_pool(pool: _PdfPool, futures: List[Future]):
+    """Abandon a timed-out job; the next extraction starts a fresh pool"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+    pool.abandon(futures)
+
+def _extract_page_range(content: bytes, start: int, end: int) -> List[str]:
+    """Extract text for pages [start, end); runs inside a worker process"""
+    # Each worker opens its own reader, PdfReader is not safe to share
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
+    return [(pdf_reader.pages[i].extract_text() or "") for i in range(start, end)]
+
 class ResumeParser:
-    def __init__(self):
+    def __init__(self, cache: Optional[ParseCache] = None):
+        self.cache = cache if cache is not None else ParseCache(
+            max_entries=settings.parse_cache_max_entries,
+            max_bytes=settings.parse_cache_max_bytes
+        )
         self.pii_patterns = {
             'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
             'phone': r'\b(?:\+?1[-.\s]?)?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})\b',
@@ -17,6 +247,33 @@ class ResumeParser:
     
     def parse(self, content: bytes, filename: str) -> str:
         """Parse resume content from various file formats"""
+        return self.parse_document(content, filename)['text']
+    
+    def parse_document(self, content: bytes, filename: str) -> Dict[str, Any]:
+        """Parse a file and extract its sections, reusing results for identical bytes"""
+        digest = content_hash(content)
+        # The extension decides which extractor runs, so it is part of the key
+        cache_key = f"{digest}:{os.path.splitext(filename)[1].lower()}"
+        
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        text = self._parse_content(content, filename)
+        sections = self.split_sections(text)
+        document = {
+            'content_hash': digest,
+            # Chunks depend only on the parsed text, so embedding reuse keys on this
+            'text_hash': content_hash(text.encode('utf-8')),
+            'text': text,
+            'sections': sections,
+            'fields': self.extract_fields(text, sections)
+        }
+        self.cache.put(cache_key, document)
+        return document
+    
+    def _parse_content(self, content: bytes, filename: str) -> str:
+        """Dispatch to the extractor matching the file extension"""
         try:
             if filename.lower().endswith('.pdf'):
                 return self._parse_pdf(content)
@@ -27,82 +284,169 @@ class ResumeParser:
             else:
                 # Try to decode as text
                 return content.decode('utf-8', errors='ignore')
+        except ResumeParseError:
+            raise
         except Exception as e:
             # Fallback to text decoding
             return content.decode('utf-8', errors='ignore')
     
     def _parse_pdf(self, content: bytes) -> str:
-        """Parse PDF content"""
+        """Parse PDF content, fanning pages out to worker processes for large files"""
+        deadline = time.monotonic() + settings.pdf_parse_timeout_seconds
+        
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
-        except Exception:
-            return "Error parsing PDF"
+            page_count = len(PyPDF2.PdfReader(io.BytesIO(content)).pages)
+        except Exception as e:
+            raise ResumeParseError("PDF_PARSE_ERROR", f"Could not read PDF: {e}")
+        
+        if page_count > settings.pdf_max_pages:
+            raise ResumeParseError(
+                "PDF_TOO_MANY_PAGES",
+                f"PDF has {page_count} pages, the limit is {settings.pdf_max_pages}"
+            )
+        
+        try:
+            if page_count < settings.pdf_parallel_min_pages:
+                pages = self._extract_pages_inline(content, page_count, deadline)
+            else:
+                pages = self._extract_pages_parallel(content, page_count, deadline)
+        except ResumeParseError:
+            raise
+        except Exception as e:
+            raise ResumeParseError("PDF_PARSE_ERROR", f"Could not extract PDF text: {e}")
+        
+        text = "\n".join(pages).strip()
+        if not text:
+            raise ResumeParseError("PDF_NO_TEXT", "PDF contains no extractable text")
+        return text
+    
+    def _extract_pages_inline(self, content: bytes, page_count: int, deadline: float) -> List[str]:
+        """Extract pages on the calling thread, checking the deadline between pages"""
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
+        pages = []
+        for i in range(page_count):
+            if time.monotonic() > deadline:
+                raise self._timeout_error()
+            pages.append(pdf_reader.pages[i].extract_text() or "")
+        return pages
+    
+    def _extract_pages_parallel(self, content: bytes, page_count: int, deadline: float) -> List[str]:
+        """Split the page range across worker processes and reassemble in order"""
+        workers = max(1, min(settings.pdf_parse_workers, page_count))
+        step = -(-page_count // workers)  # ceil division
+        pool = _get_pdf_pool()
+        futures = [
+            pool.submit(_extract_page_range, content, start, min(start + step, page_count))
+            for start in range(0, page_count, step)
+        ]
+        
+        pages = []
+        try:
+            for future in futures:
+                pages.extend(future.result(timeout=max(0.0, deadline - time.monotonic())))
+        except FutureTimeoutError:
+            _retire_pdf_pool(pool, futures)
+            raise self._timeout_error()
+        return pages
+    
+    def _timeout_error(self) -> ResumeParseError:
+        return ResumeParseError(
+            "PDF_TIMEOUT",
+            f"PDF extraction exceeded {settings.pdf_parse_timeout_seconds} seconds"
+        )
     
     def _parse_docx(self, content: bytes) -> str:
         """Parse DOCX content"""
         try:
             # Try using python-docx first
             doc = Document(io.BytesIO(content))
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
+            return "\n".join(paragraph.text for paragraph in doc.paragraphs).strip()
         except Exception:
             try:
                 # Fallback to docx2txt
                 return docx2txt.process(io.BytesIO(content))
-            except Exception:
-                return "Error parsing DOCX"
+            except Exception as e:
+                raise ResumeParseError("DOCX_PARSE_ERROR", f"Could not read document: {e}")
     
     def extract_sections(self, content: str) -> Dict[str, str]:
         """Extract structured sections from resume content"""
         sections = {}
+        for section_name, section_text in self.split_sections(content):
+            if section_name != GENERAL_SECTION:
+                sections[section_name] = section_text
+        return sections
+    
+    def split_sections(self, content: str) -> List[Tuple[str, str]]:
+        """Split resume content into ordered (section, text) blocks
         
-        # Common section headers
-        section_patterns = {
-            'experience': r'(?i)(experience|work\s+history|employment|professional\s+experience)',
-            'education': r'(?i)(education|academic|qualifications)',
-            'skills': r'(?i)(skills|technical\s+skills|competencies)',
-            'summary': r'(?i)(summary|profile|objective|about)',
-            'projects': r'(?i)(projects|portfolio)',
-            'certifications': r'(?i)(certifications|certificates)'
+        Text before the first recognised header is returned under the
+        "general" section so that no content is lost when chunking. Headers
+        are found with one scan of SECTION_HEADER_PATTERN over the document.
+        """
+        blocks = []
+        current_section = GENERAL_SECTION
+        block_start = 0
+        
+        for match in SECTION_HEADER_PATTERN.finditer(content):
+            self._append_block(blocks, current_section, content[block_start:match.start()])
+            current_section = match.lastgroup
+            block_start = match.start()
+        
+        self._append_block(blocks, current_section, content[block_start:])
+        return blocks
+    
+    def _append_block(self, blocks: List[Tuple[str, str]], section: str, text: str):
+        """Normalise a block to stripped, non-empty lines and keep it if anything remains"""
+        lines = [line.strip() for line in text.split('\n')]
+        block_text = '\n'.join(line for line in lines if line)
+        if block_text:
+            blocks.append((section, block_text))
+    
+    def extract_fields(self, content: str, sections: Optional[List[Tuple[str, str]]] = None) -> Dict[str, Any]:
+        """Extract skills, titles, degrees and total years of experience for pre-filtering"""
+        if sections is None:
+            sections = self.split_sections(content)
+        
+        skills = {canonical_skill(m.group(1)) for m in SKILL_PATTERN.finditer(content)}
+        titles = {canonical_title(m.group(0)) for m in TITLE_PATTERN.finditer(content)}
+        
+        education = '\n'.join(text for name, text in sections if name == 'education') or content
+        degrees = {degree for degree, pattern in DEGREE_PATTERNS.items() if pattern.search(education)}
+        
+        experience = '\n'.join(text for name, text in sections if name == 'experience') or content
+        years = self._years_of_experience(content, experience)
+        
+        return {
+            'skills': sorted(skills),
+            'titles': sorted(titles),
+            'degrees': sorted(degrees),
+            'years_experience': years
         }
+    
+    def _years_of_experience(self, content: str, experience: str) -> Optional[float]:
+        """Take the larger of a stated "N years" claim and the merged span of dated roles"""
+        stated = [float(m.group(1)) for m in YEARS_PATTERN.finditer(content)]
         
-        lines = content.split('\n')
-        current_section = None
-        current_content = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Check if this line is a section header
-            section_found = False
-            for section_name, pattern in section_patterns.items():
-                if re.search(pattern, line):
-                    # Save previous section
-                    if current_section and current_content:
-                        sections[current_section] = '\n'.join(current_content)
-                    
-                    # Start new section
-                    current_section = section_name
-                    current_content = [line]
-                    section_found = True
-                    break
-            
-            if not section_found and current_section:
-                current_content.append(line)
-        
-        # Save last section
-        if current_section and current_content:
-            sections[current_section] = '\n'.join(current_content)
+        current_year = time.gmtime().tm_year
+        ranges = []
+        for m in DATE_RANGE_PATTERN.finditer(experience):
+            start = int(m.group(1))
+            end = current_year if not m.group(2)[0].isdigit() else int(m.group(2))
+            if start <= end <= current_year:
+                ranges.append((start, end))
         
-        return sections
+        # Merge overlapping roles so concurrent jobs are not double counted
+        spanned = 0
+        last_end = None
+        for start, end in sorted(ranges):
+            if last_end is not None and start < last_end:
+                start = last_end
+            if end > start:
+                spanned += end - start
+            last_end = end if last_end is None else max(last_end, end)
+        
+        candidates = [value for value in stated if value <= 60] + ([float(spanned)] if ranges else [])
+        return max(candidates) if candidates else None
     
     def extract_contact_info(self, content: str) -> Dict[str, str]:
         """Extract contact information from resume"""
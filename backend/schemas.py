@@ -1,11 +1,13 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
+import uuid
 
 class UserRole(str, Enum):
     RECRUITER = "recruiter"
     CANDIDATE = "candidate"
+    ADMIN = "admin"
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -37,6 +39,27 @@ class ResumeResponse(BaseModel):
     content: str
     created_at: datetime
     
+    @field_validator("id", mode="before")
+    @classmethod
+    def id_as_string(cls, value):
+        # ORM rows carry uuid.UUID primary keys
+        return str(value) if isinstance(value, uuid.UUID) else value
+    
+    class Config:
+        from_attributes = True
+
+class ResumeSummary(BaseModel):
+    """Listing view of a resume: no body, only the redacted preview"""
+    id: str
+    filename: str
+    preview: Optional[str] = None
+    created_at: datetime
+    
+    @field_validator("id", mode="before")
+    @classmethod
+    def id_as_string(cls, value):
+        return str(value) if isinstance(value, uuid.UUID) else value
+    
     class Config:
         from_attributes = True
 
@@ -52,12 +75,26 @@ class JobResponse(BaseModel):
     requirements: str
     created_at: datetime
     
+    @field_validator("id", mode="before")
+    @classmethod
+    def id_as_string(cls, value):
+        # ORM rows carry uuid.UUID primary keys
+        return str(value) if isinstance(value, uuid.UUID) else value
+    
     class Config:
         from_attributes = True
 
+class CandidateFilters(BaseModel):
+    skills: Optional[List[str]] = None  # all must be present
+    titles: Optional[List[str]] = None  # any may match
+    degrees: Optional[List[str]] = None  # any may match: associate, bachelor, master, phd
+    min_years: Optional[float] = None
+
 class AskRequest(BaseModel):
     query: str
     k: int = 5
+    sections: Optional[List[str]] = None  # e.g. ["skills", "experience"]
+    filters: Optional[CandidateFilters] = None
 
 class EvidenceItem(BaseModel):
     resume_id: str
@@ -72,6 +109,8 @@ class AskResponse(BaseModel):
 
 class MatchRequest(BaseModel):
     top_n: int = 10
+    sections: Optional[List[str]] = None
+    filters: Optional[CandidateFilters] = None
 
 class CandidateMatch(BaseModel):
     resume_id: str
@@ -89,7 +128,15 @@ class ErrorResponse(BaseModel):
 
 class PaginatedResponse(BaseModel):
     items: List[Any]
-    total: int
+    total: Optional[int] = None  # only computed on the first page or when requested
     limit: int
-    offset: int
+    offset: Optional[int] = None  # set for offset pagination
     next_offset: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class PIIAuditResponse(BaseModel):
+    documents: int
+    seconds: float
+    documents_per_second: float
+    counts: Dict[str, int]
+    resume_ids: Dict[str, List[str]]
@@ -13,7 +13,7 @@ import zipfile
 import io
 from pathlib import Path
 
-from database import get_db, engine, Base
+from database import get_sync_db as get_db, engine, Base
 from models import User, Resume, Job, ResumeEmbedding, UserRole
 from schemas import (
     UserCreate, UserLogin, UserResponse, ResumeResponse, ResumeUpload,
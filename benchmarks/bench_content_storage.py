@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Compare database size with plain resume bodies and copied chunk texts vs
+compressed bodies and offset-only chunks
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import uuid
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from database import create_db_engine
+from embedding_service import Chunk, EmbeddingService, embedding_rows, insert_embedding_rows
+from migrations import migrate
+from models import Resume, User
+from resume_parser import ResumeParser
+
+WORDS = (
+    "python java sql kubernetes docker aws terraform react typescript pipelines "
+    "designed built led migrated optimised reduced latency throughput team customers "
+    "platform services data analytics reporting billing payments search ranking "
+    "university bachelor master degree certified engineer senior manager intern"
+).split()
+
+def make_resume(rng, lines):
+    body = []
+    for header in ("SUMMARY", "SKILLS", "EXPERIENCE", "EDUCATION"):
+        body.append(header)
+        for _ in range(lines):
+            body.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))).capitalize() + ".")
+    return "\n".join(body)
+
+def write(url, resumes, dimensions, compact):
+    settings.resume_compression = "zlib" if compact else "none"
+    engine = create_db_engine(url)
+    migrate(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    service = EmbeddingService.__new__(EmbeddingService)
+    service.chunk_size, service.chunk_overlap = 500, 50
+    parser = ResumeParser()
+    embedding = "[" + ",".join(["0.0123456789"] * dimensions) + "]"
+    
+    db = Session()
+    try:
+        user = User(email="bench@example.com", hashed_password="x", full_name="Bench")
+        db.add(user)
+        db.flush()
+        for content in resumes:
+            resume = Resume(filename="cv.txt", content=content, user_id=user.id)
+            db.add(resume)
+            db.flush()
+            chunks = service._split_sections_into_chunks(parser.split_sections(content), content)
+            if not compact:
+                # Previous layout: every chunk stores its own text
+                chunks = [Chunk(chunk.section, chunk.text) for chunk in chunks]
+            insert_embedding_rows(db, embedding_rows(resume.id, chunks, [embedding] * len(chunks)))
+        db.commit()
+    finally:
+        db.close()
+    
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+    engine.dispose()
+    return os.path.getsize(url[len("sqlite:///"):])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resumes", type=int, default=1000)
+    parser.add_argument("--lines", type=int, default=12, help="Lines per section")
+    parser.add_argument("--dimensions", type=int, default=384, help="Embedding size; 0 isolates the text")
+    parser.add_argument("--dir", default=None, help="Directory for the database files")
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    resumes = [make_resume(rng, args.lines) for _ in range(args.resumes)]
+    text_bytes = sum(len(content) for content in resumes)
+    print(f"{args.resumes} resumes, {text_bytes / 1e6:.1f} MB of text, {args.dimensions}-d embeddings")
+    
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        sizes = {}
+        for label, compact in (("plain bodies, chunk text copies", False), ("zlib bodies, chunk offsets", True)):
+            url = f"sqlite:///{os.path.join(directory, uuid.uuid4().hex + '.db')}"
+            sizes[compact] = write(url, resumes, args.dimensions, compact)
+            print(f"{label:34s} {sizes[compact] / 1e6:8.1f} MB")
+        print(f"{'reduction':34s} {100 * (1 - sizes[True] / sizes[False]):8.1f} %")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark writing embedding chunk rows: one ORM object per chunk vs Core executemany
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from database import create_db_engine
+from embedding_service import embedding_rows, insert_embedding_rows
+from migrations import migrate
+from models import ResumeEmbedding
+
+def make_load(resumes, chunks_per_resume, dimensions):
+    """(resume_id, section_chunks, embeddings) per resume, like the encoder output"""
+    rng = np.random.default_rng(0)
+    return [
+        (
+            uuid.uuid4(),
+            [("experience", f"chunk {i} " + "built data pipelines " * 20) for i in range(chunks_per_resume)],
+            rng.standard_normal((chunks_per_resume, dimensions)).astype(np.float32)
+        )
+        for _ in range(resumes)
+    ]
+
+def orm_per_chunk(Session, load):
+    """The old path: one ResumeEmbedding per chunk, one commit per resume"""
+    for resume_id, section_chunks, embeddings in load:
+        db = Session()
+        try:
+            for i, ((section, chunk), embedding) in enumerate(zip(section_chunks, embeddings)):
+                db.add(ResumeEmbedding(
+                    resume_id=resume_id,
+                    chunk_text=chunk,
+                    section=section,
+                    embedding=json.dumps(embedding.tolist()),
+                    chunk_index=i
+                ))
+            db.commit()
+        finally:
+            db.close()
+
+def core_per_resume(Session, load):
+    """Core executemany, one commit per resume (single uploads)"""
+    for resume_id, section_chunks, embeddings in load:
+        db = Session()
+        try:
+            insert_embedding_rows(db, embedding_rows(resume_id, section_chunks, embeddings))
+            db.commit()
+        finally:
+            db.close()
+
+def core_batched(Session, load):
+    """Core executemany across all resumes in one transaction (bulk ingest)"""
+    db = Session()
+    try:
+        rows = []
+        for resume_id, section_chunks, embeddings in load:
+            rows.extend(embedding_rows(resume_id, section_chunks, embeddings))
+        insert_embedding_rows(db, rows)
+        db.commit()
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resumes", type=int, default=500)
+    parser.add_argument("--chunks", type=int, default=20, help="Chunks per resume")
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--dir", default=None, help="Directory for the database files (use a real disk)")
+    args = parser.parse_args()
+    
+    load = make_load(args.resumes, args.chunks, args.dimensions)
+    total = args.resumes * args.chunks
+    print(f"{total} chunks ({args.resumes} resumes x {args.chunks}), {args.dimensions}-d embeddings")
+    
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for label, write in (
+            ("ORM add per chunk, commit per resume", orm_per_chunk),
+            ("Core executemany, commit per resume", core_per_resume),
+            ("Core executemany, one batch", core_batched),
+        ):
+            engine = create_db_engine(f"sqlite:///{os.path.join(directory, write.__name__ + '.db')}")
+            migrate(engine)
+            Session = sessionmaker(bind=engine, autoflush=False)
+            
+            start = time.perf_counter()
+            write(Session, load)
+            elapsed = time.perf_counter() - start
+            
+            with engine.connect() as conn:
+                written = conn.scalar(select(func.count()).select_from(ResumeEmbedding.__table__))
+            assert written == total, written
+            engine.dispose()
+            
+            print(label)
+            print(f"  seconds:           {elapsed:10.2f}")
+            print(f"  chunks/s:          {total / elapsed:10.0f}")
+
+if __name__ == "__main__":
+    main()
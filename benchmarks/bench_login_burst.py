@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark event-loop responsiveness during a burst of concurrent logins
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from auth import get_password_hash, verify_password, verify_password_async, PasswordHasherBusy
+
+PASSWORD = "correct horse battery staple"
+
+def make_app(hashed_password):
+    app = FastAPI()
+    
+    @app.post("/login/inline")
+    async def login_inline():
+        # How register/login used to run bcrypt: on the event loop
+        return {"ok": verify_password(PASSWORD, hashed_password)}
+    
+    @app.post("/login/executor")
+    async def login_executor():
+        try:
+            return {"ok": await verify_password_async(PASSWORD, hashed_password)}
+        except PasswordHasherBusy as exc:
+            raise HTTPException(status_code=503, headers={"Retry-After": str(exc.retry_after)})
+    
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+    
+    return app
+
+async def run_burst(client, path, logins, pings, interval):
+    latencies = []
+    
+    async def probe():
+        # Pings go out on a fixed schedule; latency is measured from the
+        # scheduled time so a blocked event loop shows up as delay
+        for i in range(pings):
+            scheduled = started + 0.01 + i * interval
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            await client.get("/ping")
+            latencies.append(time.perf_counter() - scheduled)
+    
+    started = time.perf_counter()
+    results = await asyncio.gather(probe(), *[client.post(path) for _ in range(logins)])
+    elapsed = time.perf_counter() - started
+    
+    statuses = [response.status_code for response in results[1:]]
+    return latencies, statuses, elapsed
+
+def report(label, latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label}")
+    print(f"  burst wall time:   {elapsed:8.2f} s")
+    print(f"  logins ok / 503:   {statuses.count(200)} / {statuses.count(503)}")
+    print(f"  /ping p50:         {statistics.median(latencies) * 1e3:8.1f} ms")
+    print(f"  /ping p99:         {p99 * 1e3:8.1f} ms")
+    print(f"  /ping max:         {latencies[-1] * 1e3:8.1f} ms")
+
+async def main_async(args):
+    app = make_app(get_password_hash(PASSWORD))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, path in (("inline bcrypt", "/login/inline"), ("password executor", "/login/executor")):
+            latencies, statuses, elapsed = await run_burst(client, path, args.logins, args.pings, args.interval)
+            report(f"{label} ({args.logins} concurrent logins)", latencies, statuses, elapsed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--pings", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between pings")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark resume section detection on a synthetic corpus
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from resume_parser import ResumeParser
+
+LEGACY_PATTERNS = {
+    'experience': r'(?i)(experience|work\s+history|employment|professional\s+experience)',
+    'education': r'(?i)(education|academic|qualifications)',
+    'skills': r'(?i)(skills|technical\s+skills|competencies)',
+    'summary': r'(?i)(summary|profile|objective|about)',
+    'projects': r'(?i)(projects|portfolio)',
+    'certifications': r'(?i)(certifications|certificates)'
+}
+
+# Header spellings vary between resumes, so the corpus mixes them
+HEADERS = [
+    ["Summary", "Professional Summary", "About Me"],
+    ["Experience", "Work Experience", "Professional Experience", "Employment History"],
+    ["Education", "EDUCATION:"],
+    ["Skills", "Key Skills", "Technical Skills", "Core Competencies"],
+    ["Projects", "Personal Projects"],
+    ["Certifications"],
+]
+WORDS = (
+    "designed built scaled migrated services pipelines python kafka postgres latency "
+    "throughput team customers platform reliability incidents observability terraform"
+).split()
+
+def legacy_extract_sections(content):
+    """The per-line, per-pattern loop ResumeParser used before the compiled grammar"""
+    sections = {}
+    current_section = None
+    current_content = []
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        section_found = False
+        for section_name, pattern in LEGACY_PATTERNS.items():
+            if re.search(pattern, line):
+                if current_section and current_content:
+                    sections[current_section] = '\n'.join(current_content)
+                current_section = section_name
+                current_content = [line]
+                section_found = True
+                break
+        if not section_found and current_section:
+            current_content.append(line)
+    if current_section and current_content:
+        sections[current_section] = '\n'.join(current_content)
+    return sections
+
+def make_resume(rng, lines_per_section):
+    lines = ["Jane Candidate", "jane@example.com"]
+    for variants in HEADERS:
+        lines.append(rng.choice(variants))
+        # A body line that starts with a section keyword but is not a header
+        lines.append("Experience in " + " ".join(rng.choice(WORDS) for _ in range(8)))
+        for _ in range(lines_per_section):
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 30))))
+    return "\n".join(lines)
+
+def time_per_document(fn, corpus):
+    start = time.perf_counter()
+    for document in corpus:
+        fn(document)
+    return (time.perf_counter() - start) / len(corpus)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--lines-per-section", type=int, default=25)
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    corpus = [make_resume(rng, args.lines_per_section) for _ in range(args.documents)]
+    avg_size = sum(len(d) for d in corpus) / len(corpus)
+    resume_parser = ResumeParser()
+    
+    legacy = time_per_document(legacy_extract_sections, corpus)
+    compiled = time_per_document(resume_parser.extract_sections, corpus)
+    
+    print(f"{len(corpus)} documents, {avg_size / 1024:.1f} KB average")
+    print(f"legacy per-line patterns: {legacy * 1e6:9.1f} us/document")
+    print(f"compiled single pass:     {compiled * 1e6:9.1f} us/document")
+    print(f"speedup:                  {legacy / compiled:9.1f}x")
+
+if __name__ == "__main__":
+    main()
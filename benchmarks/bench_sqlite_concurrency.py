@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark SQLite read latency while a writer commits embedding-sized batches
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from database import create_db_engine
+
+SCHEMA = """
+CREATE TABLE chunks (
+    id INTEGER PRIMARY KEY,
+    resume_id INTEGER NOT NULL,
+    chunk_text TEXT NOT NULL,
+    embedding TEXT NOT NULL
+)
+"""
+
+def seed(engine, resumes, chunks_per_resume):
+    with engine.begin() as conn:
+        conn.execute(text(SCHEMA))
+        conn.execute(text("CREATE INDEX ix_chunks_resume_id ON chunks (resume_id)"))
+        conn.execute(
+            text("INSERT INTO chunks (resume_id, chunk_text, embedding) VALUES (:r, :t, :e)"),
+            [
+                {"r": r, "t": "experience " * 40, "e": "[" + ",".join(["0.1"] * 384) + "]"}
+                for r in range(resumes) for _ in range(chunks_per_resume)
+            ]
+        )
+
+def make_engine(url, tuned):
+    if tuned:
+        return create_db_engine(url)
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+def writer(url, tuned, batch, first_resume, stop, writes, errors):
+    """Commit embedding-sized batches, one INSERT per chunk as the ORM did"""
+    engine = make_engine(url, tuned)
+    resume_id = first_resume
+    while not stop.is_set():
+        try:
+            with engine.begin() as conn:
+                for _ in range(batch):
+                    conn.execute(
+                        text("INSERT INTO chunks (resume_id, chunk_text, embedding) VALUES (:r, :t, :e)"),
+                        {"r": resume_id, "t": "skills " * 40, "e": "[" + ",".join(["0.2"] * 384) + "]"}
+                    )
+            with writes.get_lock():
+                writes.value += batch
+        except OperationalError:
+            with errors.get_lock():
+                errors.value += 1
+        resume_id += 1
+
+def reader(url, tuned, resumes, seed_value, stop, results):
+    engine = make_engine(url, tuned)
+    resume_id = seed_value
+    latencies = []
+    errors = 0
+    while not stop.is_set():
+        resume_id = (resume_id * 31 + 7) % resumes
+        start = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(
+                    text("SELECT chunk_text, embedding FROM chunks WHERE resume_id = :r"),
+                    {"r": resume_id}
+                ).fetchall()
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            errors += 1
+    results.put((latencies, errors))
+
+def run(url, tuned, seconds, readers, batch, resumes):
+    """Run one writer and several readers in separate processes"""
+    stop = multiprocessing.Event()
+    writes = multiprocessing.Value("i", 0)
+    write_errors = multiprocessing.Value("i", 0)
+    results = multiprocessing.Queue()
+    
+    processes = [multiprocessing.Process(
+        target=writer, args=(url, tuned, batch, resumes, stop, writes, write_errors)
+    )]
+    processes += [
+        multiprocessing.Process(target=reader, args=(url, tuned, resumes, i, stop, results))
+        for i in range(readers)
+    ]
+    for process in processes:
+        process.start()
+    time.sleep(seconds)
+    stop.set()
+    
+    latencies = []
+    read_errors = 0
+    for _ in range(readers):
+        reader_latencies, errors = results.get()
+        latencies.extend(reader_latencies)
+        read_errors += errors
+    for process in processes:
+        process.join()
+    
+    return latencies, read_errors, writes.value, write_errors.value
+
+def report(label, latencies, errors, writes, write_errors, seconds):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else float("nan")
+    print(label)
+    print(f"  reads/s:           {len(latencies) / seconds:10.0f}")
+    print(f"  read p50:          {statistics.median(latencies) * 1e3 if latencies else float('nan'):10.2f} ms")
+    print(f"  read p99:          {p99 * 1e3:10.2f} ms")
+    print(f"  read errors:       {errors:10d}")
+    print(f"  chunk writes/s:    {writes / seconds:10.0f}")
+    print(f"  write errors:      {write_errors:10d}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=20, help="Chunks per write transaction (one resume)")
+    parser.add_argument("--resumes", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=10, help="Seed chunks per resume")
+    parser.add_argument("--dir", default=None, help="Directory for the database files (use a real disk)")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for label, tuned in (
+            ("default engine (rollback journal)", False),
+            ("create_db_engine (WAL, synchronous=NORMAL, mmap, busy timeout)", True),
+        ):
+            url = f"sqlite:///{os.path.join(directory, 'tuned.db' if tuned else 'default.db')}"
+            engine = make_engine(url, tuned)
+            seed(engine, args.resumes, args.chunks)
+            engine.dispose()
+            latencies, errors, writes, write_errors = run(
+                url, tuned, args.seconds, args.readers, args.batch, args.resumes
+            )
+            report(label, latencies, errors, writes, write_errors, args.seconds)
+
+if __name__ == "__main__":
+    main()
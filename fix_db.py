@@ -8,47 +8,40 @@ import os
 # Add the backend directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
-from database import engine, Base
+from database import engine
+from migrations import migrate
 from models import User, Resume, Job, ResumeEmbedding, UserRole
 from auth import get_password_hash
 from sqlalchemy.orm import sessionmaker
 
+def ensure_user(db, email, full_name, role, hashed_password):
+    """Create a test user, or reset the password of an existing one"""
+    user = db.query(User).filter(User.email == email).first()
+    if user is None:
+        db.add(User(email=email, hashed_password=hashed_password, full_name=full_name, role=role))
+    else:
+        user.hashed_password = hashed_password
+
 def fix_database():
-    """Fix the database by recreating tables and adding test users"""
+    """Fix the database by migrating the schema and resetting the test users"""
     print("Fixing ResumeRAG database...")
     
     try:
-        # Drop all tables first
-        Base.metadata.drop_all(bind=engine)
-        print("Dropped existing tables")
-        
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
-        print("Created new tables")
+        # Migrate in place instead of dropping tables, so existing data survives
+        applied = migrate(engine)
+        print(f"Applied migrations: {', '.join(applied)}" if applied else "Schema is up to date")
         
         # Create test users
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
         db = SessionLocal()
         
-        # Create candidate user
-        candidate = User(
-            email="candidate@example.com",
-            hashed_password=get_password_hash("test"),
-            full_name="Test Candidate",
-            role=UserRole.CANDIDATE
-        )
-        db.add(candidate)
-        print("Created test candidate user")
+        # Create candidate user, or reset its password
+        ensure_user(db, "candidate@example.com", "Test Candidate", UserRole.CANDIDATE, get_password_hash("test"))
+        print("Test candidate user ready")
         
-        # Create recruiter user
-        recruiter = User(
-            email="recruiter@example.com",
-            hashed_password=get_password_hash("test"),
-            full_name="Test Recruiter",
-            role=UserRole.RECRUITER
-        )
-        db.add(recruiter)
-        print("Created test recruiter user")
+        # Create recruiter user, or reset its password
+        ensure_user(db, "recruiter@example.com", "Test Recruiter", UserRole.RECRUITER, get_password_hash("test"))
+        print("Test recruiter user ready")
         
         db.commit()
         print("Database fix complete!")
@@ -8,7 +8,8 @@ import os
 # Add the backend directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
-from database import engine, Base
+from database import engine
+from migrations import migrate
 from models import User, Resume, Job, ResumeEmbedding, UserRole
 
 def init_database():
@@ -16,9 +17,9 @@ def init_database():
     print("Initializing ResumeRAG database...")
     
     try:
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
-        print("Database tables created successfully!")
+        # Create or upgrade the schema
+        applied = migrate(engine)
+        print(f"Applied migrations: {', '.join(applied)}" if applied else "Schema is up to date")
         
         # Create test users
         from auth import get_password_hash
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import admin
+from admin import provision_admin
+from database import create_db_engine
+from migrations import migrate
+from models import User, UserRole
+
+@pytest.fixture
+def db_engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'admin.db'}")
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+def load_user(db_engine, email):
+    with Session(db_engine) as db:
+        return db.scalar(select(User).where(User.email == email))
+
+def test_creates_admin_with_password(db_engine, monkeypatch):
+    monkeypatch.setattr(admin, "get_password_hash", lambda password: f"hashed:{password}")
+    
+    assert provision_admin(db_engine, "admin@example.com", "s3cret") == "created"
+    
+    user = load_user(db_engine, "admin@example.com")
+    assert user.role == UserRole.ADMIN
+    assert user.hashed_password == "hashed:s3cret"
+
+def test_promotes_existing_user_and_keeps_password(db_engine):
+    with Session(db_engine) as db:
+        db.add(User(email="lead@example.com", hashed_password="hash", full_name="Lead", role=UserRole.RECRUITER))
+        db.commit()
+    
+    assert provision_admin(db_engine, "lead@example.com") == "promoted"
+    assert provision_admin(db_engine, "lead@example.com") == "unchanged"
+    
+    user = load_user(db_engine, "lead@example.com")
+    assert user.role == UserRole.ADMIN
+    assert user.hashed_password == "hash"
+
+def test_new_admin_requires_password(db_engine):
+    with pytest.raises(ValueError):
+        provision_admin(db_engine, "admin@example.com")
+    assert load_user(db_engine, "admin@example.com") is None
@@ -1,26 +1,29 @@
 import pytest
 import asyncio
+import uuid
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from backend.main import app
-from backend.database import get_db, Base
-from backend.models import User, Resume, Job
-from backend.auth import get_password_hash
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import main
+from admin import provision_admin
+from main import app, idempotency_store
+from database import get_db, Base
+from models import User, Resume, Job
+from auth import create_access_token, get_password_hash
+from config import settings
 
 # Test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+TestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
+async def override_get_db():
+    async with TestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+idempotency_store.session_factory = TestingSessionLocal
 
 client = TestClient(app)
 
@@ -130,6 +133,176 @@ def test_get_resumes(setup_database, test_user):
     assert "limit" in data
     assert "offset" in data
 
+def test_get_resumes_summary_and_full(setup_database, test_user):
+    register_response = client.post("/api/register", json=test_user)
+    headers = {"Authorization": f"Bearer {register_response.json()['access_token']}"}
+    
+    client.post(
+        "/api/resumes",
+        files={"file": ("summary.txt", b"Jane Roe, reach me at jane@example.com. Python developer.", "text/plain")},
+        headers=headers
+    )
+    
+    summary = client.get("/api/resumes", headers=headers).json()["items"][0]
+    assert "content" not in summary
+    assert summary["filename"] == "summary.txt"
+    assert "[EMAIL REDACTED]" in summary["preview"]
+    
+    full = client.get("/api/resumes?fields=full", headers=headers).json()["items"][0]
+    assert "Python developer" in full["content"]
+
+def test_summary_rebuilds_previews_after_a_pattern_change(setup_database, test_user):
+    register_response = client.post("/api/register", json=test_user)
+    headers = {"Authorization": f"Bearer {register_response.json()['access_token']}"}
+    client.post(
+        "/api/resumes",
+        files={"file": ("stale.txt", b"Reach me at jane@example.com", "text/plain")},
+        headers=headers
+    )
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE resumes SET preview = 'Reach me at jane@example.com', pii_version = 'old'"))
+    
+    summary = client.get("/api/resumes", headers=headers).json()["items"][0]
+    
+    assert summary["preview"] == "Reach me at [EMAIL REDACTED]"
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT pii_version FROM resumes")).scalar() != "old"
+
+def test_search_covers_plain_and_compressed_resumes(setup_database, test_user, monkeypatch):
+    register_response = client.post("/api/register", json=test_user)
+    headers = {"Authorization": f"Bearer {register_response.json()['access_token']}"}
+    body = b"Kubernetes operator experience. " * 40
+    
+    client.post("/api/resumes", files={"file": ("plain.txt", body, "text/plain")}, headers=headers)
+    monkeypatch.setattr(settings, "resume_compression", "zlib")
+    client.post("/api/resumes", files={"file": ("packed.txt", body + b"x", "text/plain")}, headers=headers)
+    client.post("/api/resumes", files={"file": ("other.txt", b"Accountant. " * 100, "text/plain")}, headers=headers)
+    
+    items = client.get("/api/resumes?q=kubernetes", headers=headers).json()["items"]
+    assert sorted(item["filename"] for item in items) == ["packed.txt", "plain.txt"]
+
+def test_search_scans_only_recent_compressed_resumes(setup_database, test_user, monkeypatch):
+    register_response = client.post("/api/register", json=test_user)
+    headers = {"Authorization": f"Bearer {register_response.json()['access_token']}"}
+    monkeypatch.setattr(settings, "resume_compression", "zlib")
+    monkeypatch.setattr(settings, "compressed_search_max_rows", 1)
+    for name in ("old.txt", "new.txt"):
+        body = f"Kubernetes operator experience in {name}. ".encode() * 40
+        client.post("/api/resumes", files={"file": (name, body, "text/plain")}, headers=headers)
+    
+    items = client.get("/api/resumes?q=kubernetes", headers=headers).json()["items"]
+    assert [item["filename"] for item in items] == ["new.txt"]
+
+def test_content_stream_applies_stored_spans(setup_database, test_user):
+    register_response = client.post("/api/register", json=test_user)
+    headers = {"Authorization": f"Bearer {register_response.json()['access_token']}"}
+    resume_id = client.post(
+        "/api/resumes",
+        files={"file": ("cv.txt", b"Reach me at jane@example.com about Python", "text/plain")},
+        headers=headers
+    ).json()["id"]
+    
+    assert client.get(f"/api/resumes/{resume_id}/content", headers=headers).text == (
+        "Reach me at [EMAIL REDACTED] about Python"
+    )
+    
+    # Current spans are trusted as stored rather than found by a new scan
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE resumes SET pii_spans = '[[35, 41, \"ssn\"]]'"))
+    assert client.get(f"/api/resumes/{resume_id}/content", headers=headers).text == (
+        "Reach me at jane@example.com about [SSN REDACTED]"
+    )
+
+FILTER_RESUMES = {
+    "engineer.txt": b"Senior Software Engineer with 6 years of Python and Golang\nEducation\nB.S. Computer Science",
+    "scientist.txt": b"Data Scientist with 2 years of Python\nEducation\nPh.D. Statistics",
+    "designer.txt": b"Designer with 10 years of Figma\nEducation\nBachelor of Arts",
+}
+
+def seed_filter_resumes(headers):
+    return {
+        name: client.post("/api/resumes", files={"file": (name, body, "text/plain")}, headers=headers).json()["id"]
+        for name, body in FILTER_RESUMES.items()
+    }
+
+@pytest.mark.parametrize("params, expected", [
+    ("skills=python", {"engineer.txt", "scientist.txt"}),
+    ("skills=python&skills=go", {"engineer.txt"}),
+    ("titles=designer&titles=data scientist", {"designer.txt", "scientist.txt"}),
+    ("degrees=bachelor", {"engineer.txt", "designer.txt"}),
+    ("min_years=5", {"engineer.txt", "designer.txt"}),
+    ("skills=python&degrees=bachelor&min_years=5", {"engineer.txt"}),
+    ("skills=rust", set()),
+    ("skills=Golang", {"engineer.txt"}),
+    ("titles=Senior Software Engineer", {"engineer.txt"}),
+    ("degrees=B.S.&degrees=Ph.D", {"engineer.txt", "designer.txt", "scientist.txt"}),
+])
+def test_listing_structured_filters(setup_database, test_user, params, expected):
+    register_response = client.post("/api/register", json=test_user)
+    headers = {"Authorization": f"Bearer {register_response.json()['access_token']}"}
+    seed_filter_resumes(headers)
+    
+    data = client.get(f"/api/resumes?{params}", headers=headers).json()
+    
+    assert {item["filename"] for item in data["items"]} == expected
+    assert data["total"] == len(expected)
+
+def test_filter_aliases_match_canonical_fields(setup_database, test_user):
+    register_response = client.post("/api/register", json=test_user)
+    headers = {"Authorization": f"Bearer {register_response.json()['access_token']}"}
+    body = b"Full-Stack Engineer building JavaScript and Node.js services"
+    client.post("/api/resumes", files={"file": ("fullstack.txt", body, "text/plain")}, headers=headers)
+    
+    for params in ("skills=js&skills=node", "titles=Full-Stack Engineer", "titles=full stack engineer"):
+        items = client.get(f"/api/resumes?{params}", headers=headers).json()["items"]
+        assert [item["filename"] for item in items] == ["fullstack.txt"], params
+
+def test_ask_and_match_score_only_filtered_candidates(setup_database, test_user, monkeypatch):
+    register_response = client.post("/api/register", json=test_user)
+    headers = {"Authorization": f"Bearer {register_response.json()['access_token']}"}
+    ids = seed_filter_resumes(headers)
+    job_id = client.post(
+        "/api/jobs", json={"title": "Engineer", "description": "Backend work", "requirements": "Python"}, headers=headers
+    ).json()["id"]
+    
+    # Record the candidate subquery each scan receives, resolved against the test database
+    scanned = []
+    def record(text, resume_ids, *args):
+        with engine.connect() as conn:
+            scanned.append({str(resume_id) for resume_id in conn.execute(resume_ids).scalars()})
+        return []
+    monkeypatch.setattr(main.embedding_service, "search", record)
+    monkeypatch.setattr(main.embedding_service, "match_job_to_resumes", record)
+    
+    ask = client.post(
+        "/api/ask", json={"query": "python", "filters": {"skills": ["python"], "min_years": 5}}, headers=headers
+    )
+    match = client.post(f"/api/jobs/{job_id}/match", json={"filters": {"degrees": ["bachelor"]}}, headers=headers)
+    
+    assert ask.status_code == match.status_code == 200
+    assert ask.json()["answer"].startswith("Based on your 1 resume(s)")
+    assert scanned == [{ids["engineer.txt"]}, {ids["engineer.txt"], ids["designer.txt"]}]
+    
+    empty_ask = client.post("/api/ask", json={"query": "python", "filters": {"titles": ["astronaut"]}}, headers=headers)
+    empty_match = client.post(f"/api/jobs/{job_id}/match", json={"filters": {"skills": ["rust"]}}, headers=headers)
+    assert empty_ask.status_code == empty_match.status_code == 404
+    assert len(scanned) == 2
+
+def test_text_starting_with_the_compression_marker_reads_back(setup_database, test_user):
+    register_response = client.post("/api/register", json=test_user)
+    headers = {"Authorization": f"Bearer {register_response.json()['access_token']}"}
+    resume_id = client.post(
+        "/api/resumes", files={"file": ("odd.txt", b"\x1fPython developer", "text/plain")}, headers=headers
+    ).json()["id"]
+    
+    full = client.get("/api/resumes?fields=full", headers=headers)
+    single = client.get(f"/api/resumes/{resume_id}", headers=headers)
+    search = client.get("/api/resumes?q=python", headers=headers)
+    
+    assert full.status_code == single.status_code == search.status_code == 200
+    assert single.json()["content"] == "\x1fPython developer"
+    assert [item["filename"] for item in search.json()["items"]] == ["odd.txt"]
+
 def test_create_job(setup_database, test_recruiter):
     # Register and login as recruiter
     register_response = client.post("/api/register", json=test_recruiter)
@@ -236,5 +409,35 @@ def test_idempotency(setup_database, test_user):
     assert response2.status_code == 200
     assert response1.json()["id"] == response2.json()["id"]
 
+def test_pii_audit_requires_admin(setup_database, test_recruiter):
+    register_response = client.post("/api/register", json=test_recruiter)
+    headers = {"Authorization": f"Bearer {register_response.json()['access_token']}"}
+    
+    response = client.get("/api/admin/pii-audit", headers=headers)
+    
+    assert response.status_code == 403
+    assert response.json()["detail"]["error"]["code"] == "FORBIDDEN"
+
+def test_pii_audit_rejects_unknown_types(setup_database):
+    token = create_access_token({"sub": str(uuid.uuid4()), "role": "admin"})
+    
+    response = client.get(
+        "/api/admin/pii-audit?types=ssn&types=passport",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    
+    assert response.status_code == 400
+    assert response.json()["detail"]["error"]["code"] == "INVALID_PII_TYPE"
+
+def test_provisioned_admin_can_run_pii_audit(setup_database):
+    provision_admin(engine, "admin@example.com", "adminpassword")
+    login_response = client.post("/api/login", json={"email": "admin@example.com", "password": "adminpassword"})
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    
+    response = client.get("/api/admin/pii-audit", headers=headers)
+    
+    assert login_response.json()["role"] == "admin"
+    assert response.status_code == 200
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import uuid
+
+import pytest
+
+import auth
+from auth import create_access_token, resolve_principal, remember_principal, principal_cache, PrincipalCache, Principal
+from models import UserRole
+
+def test_role_claim_resolves_from_token():
+    principal_cache.clear()
+    user_id = uuid.uuid4()
+    token = create_access_token({"sub": str(user_id), "role": "recruiter"})
+    
+    principal = resolve_principal(token)
+    
+    assert principal.id == user_id
+    assert principal.role == UserRole.RECRUITER
+    assert principal_cache.get(token) is principal
+
+def test_legacy_token_is_cached_once_role_is_known():
+    principal_cache.clear()
+    user_id = uuid.uuid4()
+    token = create_access_token({"sub": str(user_id)})
+    
+    principal = resolve_principal(token)
+    assert principal.id == user_id
+    assert principal.role is None
+    assert len(principal_cache) == 0
+    
+    remember_principal(token, principal, UserRole.CANDIDATE)
+    
+    assert resolve_principal(token).role == UserRole.CANDIDATE
+
+def test_invalid_tokens_are_rejected():
+    principal_cache.clear()
+    
+    assert resolve_principal("not-a-token") is None
+    assert resolve_principal(create_access_token({"sub": "not-a-uuid", "role": "candidate"})) is None
+    assert len(principal_cache) == 0
+
+def test_cache_entries_expire():
+    cache = PrincipalCache(ttl_seconds=60, max_entries=2)
+    principal = Principal(uuid.uuid4(), UserRole.CANDIDATE)
+    
+    cache.put("a", principal, token_expires_at=130, now=100)
+    
+    assert cache.get("a", now=125) is principal
+    assert cache.get("a", now=131) is None
+
+def test_password_work_is_shed_when_queue_is_full(monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(auth, "_password_slots", slots)
+    
+    assert asyncio.run(auth._run_password_work(lambda value: value * 2, 21)) == 42
+    
+    slots.acquire()
+    with pytest.raises(auth.PasswordHasherBusy) as exc_info:
+        asyncio.run(auth._run_password_work(lambda value: value, 1))
+    assert exc_info.value.retry_after > 0
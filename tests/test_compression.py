@@ -0,0 +1,73 @@
+import uuid
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.orm import sessionmaker
+
+from compression import PREFIX, compress_text, decompress_text
+from config import settings
+from database import create_db_engine
+from migrations import migrate
+from models import Resume
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'compression.db'}")
+    migrate(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def test_zlib_round_trip_and_plain_passthrough():
+    body = "Senior engineer. " * 100
+    
+    compressed = compress_text(body, "zlib")
+    
+    assert compressed.startswith(PREFIX + "zlib:")
+    assert len(compressed) < len(body) / 4
+    assert decompress_text(compressed) == body
+    assert decompress_text("plain text") == "plain text"
+
+def test_resume_content_is_compressed_only_when_enabled(db, monkeypatch):
+    body = "Python developer with ten years of experience. " * 40
+    plain = Resume(filename="plain.txt", content=body, user_id=uuid.uuid4())
+    db.add(plain)
+    db.commit()
+    
+    monkeypatch.setattr(settings, "resume_compression", "zlib")
+    short = Resume(filename="short.txt", content="Go", user_id=plain.user_id)
+    packed = Resume(filename="packed.txt", content=body, user_id=plain.user_id)
+    db.add_all([short, packed])
+    db.commit()
+    db.expire_all()
+    
+    stored = dict(db.execute(text("SELECT filename, content FROM resumes")).all())
+    assert stored["plain.txt"] == body and stored["short.txt"] == "Go"
+    assert stored["packed.txt"].startswith(PREFIX) and len(stored["packed.txt"]) < len(body) / 4
+    assert db.scalars(select(Resume.content).order_by(Resume.filename)).all() == [body, body, "Go"]
+    
+    # Comparison operands are bound as plain text, never compressed
+    assert db.scalars(select(Resume.filename).where(Resume.content.like(f"{PREFIX}%"))).all() == ["packed.txt"]
+
+@pytest.mark.parametrize("codec, min_bytes", [("none", 512), ("zlib", 512), ("zlib", 0)])
+def test_plain_values_starting_with_the_prefix_round_trip(db, monkeypatch, codec, min_bytes):
+    monkeypatch.setattr(settings, "resume_compression", codec)
+    monkeypatch.setattr(settings, "resume_compression_min_bytes", min_bytes)
+    body = PREFIX + "Go"
+    resume = Resume(filename="odd.txt", content=body, user_id=uuid.uuid4())
+    db.add(resume)
+    db.commit()
+    db.expire_all()
+    
+    stored = db.execute(text("SELECT content FROM resumes")).scalar()
+    assert stored == PREFIX + "plain:" + body
+    assert db.scalar(select(Resume.content)) == body
+
+def test_none_codec_leaves_ordinary_text_unmarked(db, monkeypatch):
+    monkeypatch.setattr(settings, "resume_compression", "none")
+    db.add(Resume(filename="a.txt", content="Python " * 200, user_id=uuid.uuid4()))
+    db.commit()
+    
+    assert db.execute(text("SELECT content FROM resumes")).scalar() == "Python " * 200
+    assert decompress_text(PREFIX + "plain:" + PREFIX + "zlib:x") == PREFIX + "zlib:x"
@@ -0,0 +1,28 @@
+from sqlalchemy import text
+
+from config import settings
+from database import create_db_engine, async_database_url
+
+def test_sqlite_connections_are_tuned(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    
+    with engine.connect() as conn:
+        pragma = lambda name: conn.execute(text(f"PRAGMA {name}")).scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == settings.sqlite_busy_timeout_ms
+        assert pragma("cache_size") == -settings.sqlite_cache_size_kb
+    
+    assert engine.pool.size() == settings.db_pool_size
+    engine.dispose()
+
+def test_in_memory_sqlite_skips_pool_sizing():
+    engine = create_db_engine("sqlite://")
+    
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.sqlite_busy_timeout_ms
+
+def test_async_database_url():
+    assert async_database_url("sqlite:///./resumerag.db") == "sqlite+aiosqlite:///./resumerag.db"
+    assert async_database_url("postgres://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert async_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
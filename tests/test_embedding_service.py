@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import uuid
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+import embedding_service
+from database import create_db_engine
+from config import settings
+from embedding_service import Chunk, EmbeddingService, embedding_rows, insert_embedding_rows, normalize_whitespace
+from migrations import migrate
+from models import Resume, ResumeEmbedding
+from resume_parser import ResumeParser
+
+class FakeModel:
+    """Counts encode calls; each chunk encodes to its length"""
+    def __init__(self):
+        self.calls = []
+    
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[float(len(text)), 1.0] for text in texts])
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'embeddings.db'}")
+    migrate(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture
+def service():
+    service = EmbeddingService.__new__(EmbeddingService)
+    service.model = FakeModel()
+    service.chunk_size = 500
+    service.chunk_overlap = 50
+    return service
+
+def test_inserted_rows_get_column_defaults(db):
+    resume_id = uuid.uuid4()
+    rows = embedding_rows(str(resume_id), [Chunk("skills", "python"), Chunk("skills", "sql")], np.ones((2, 3)))
+    insert_embedding_rows(db, rows, batch_size=1)
+    db.commit()
+    
+    stored = db.scalars(select(ResumeEmbedding).order_by(ResumeEmbedding.chunk_index)).all()
+    assert [(row.resume_id, row.chunk_text, row.chunk_index) for row in stored] == [
+        (resume_id, "python", 0), (resume_id, "sql", 1)
+    ]
+    assert all(row.id and row.created_at for row in stored)
+    assert stored[0].embedding == "[1.0, 1.0, 1.0]"
+
+def test_batch_encodes_once_and_reuses_duplicate_content(db, service):
+    first, second, duplicate = (str(uuid.uuid4()) for _ in range(3))
+    rows = service._build_embedding_rows(db, [
+        (first, "Python and SQL", "hash-a", None),
+        (second, "Kubernetes", "hash-b", [("skills", "Kubernetes")]),
+        (duplicate, "Python and SQL", "hash-a", None),
+    ])
+    
+    assert service.model.calls == [["Python and SQL", "Kubernetes"]]
+    by_resume = {}
+    for row in rows:
+        by_resume.setdefault(str(row["resume_id"]), []).append(
+            (row["section"], row["chunk_text"], row["start_offset"], row["end_offset"], row["embedding"])
+        )
+    assert by_resume[duplicate] == by_resume[first] == [("general", "", 0, 14, "[14.0, 1.0]")]
+    assert by_resume[second] == [("skills", "", 0, 10, "[10.0, 1.0]")]
+
+def test_stored_duplicate_is_copied_without_encoding(db, service):
+    user_id = uuid.uuid4()
+    donor = Resume(filename="a.txt", content="Go", text_hash="hash-a", user_id=user_id)
+    copy = Resume(filename="b.txt", content="Go", text_hash="hash-a", user_id=user_id)
+    db.add_all([donor, copy])
+    db.flush()
+    insert_embedding_rows(db, embedding_rows(donor.id, [Chunk("general", "Go")], ["[1.0]"]))
+    db.commit()
+    
+    rows = service._build_embedding_rows(db, [(str(copy.id), "Go", "hash-a", None)])
+    
+    assert service.model.calls == []
+    assert rows == [{
+        "resume_id": copy.id, "chunk_text": "Go", "start_offset": None, "end_offset": None,
+        "section": "general", "embedding": "[1.0]", "chunk_index": 0
+    }]
+
+def test_same_bytes_parsed_differently_are_encoded_again(db, service):
+    user_id = uuid.uuid4()
+    donor = Resume(filename="a.pdf", content="Go", content_hash="bytes", text_hash="text-a", user_id=user_id)
+    other = Resume(filename="a.txt", content="Rust", content_hash="bytes", text_hash="text-b", user_id=user_id)
+    db.add_all([donor, other])
+    db.flush()
+    insert_embedding_rows(db, embedding_rows(donor.id, [Chunk("general", "Go")], ["[1.0]"]))
+    db.commit()
+    
+    rows = service._build_embedding_rows(db, [(str(other.id), "Rust", "text-b", None)])
+    
+    assert service.model.calls == [["Rust"]]
+    assert [(row["resume_id"], row["embedding"]) for row in rows] == [(other.id, "[4.0, 1.0]")]
+
+def test_background_task_encodes_off_the_event_loop(service, monkeypatch):
+    threads = []
+    monkeypatch.setattr(service, "_generate_embeddings", lambda jobs: threads.append(threading.get_ident()))
+    
+    asyncio.run(service._generate_embeddings_task([(str(uuid.uuid4()), "Go", None, None)]))
+    
+    assert threads and threads[0] != threading.get_ident()
+
+def test_candidates_are_resolved_from_an_id_subquery(db, service):
+    user_id = uuid.uuid4()
+    kept = Resume(filename="a.txt", content="Go", user_id=user_id, years_experience=5)
+    skipped = Resume(filename="b.txt", content="Go", user_id=user_id, years_experience=1)
+    db.add_all([kept, skipped])
+    db.flush()
+    for resume in (kept, skipped):
+        insert_embedding_rows(db, embedding_rows(resume.id, [Chunk("skills", "Go"), Chunk("experience", "Go")], ["[1.0]", "[1.0]"]))
+    db.commit()
+    
+    candidate_ids = select(Resume.id).where(Resume.user_id == user_id, Resume.years_experience >= 3)
+    chunks = service._candidate_embeddings(db, candidate_ids, ["skills"])
+    
+    assert [(chunk.resume_id, chunk.section) for chunk in chunks] == [(kept.id, "skills")]
+
+def test_offset_chunks_are_read_back_from_compressed_content(db, service, monkeypatch):
+    monkeypatch.setattr(settings, "resume_compression", "zlib")
+    monkeypatch.setattr(settings, "resume_compression_min_bytes", 0)
+    service.chunk_size = 40
+    service.chunk_overlap = 10
+    content = "Jane Doe\n\nSKILLS\n  Python,   SQL and Go.\nEXPERIENCE\n" + "Built  data pipelines at Acme. " * 4
+    sections = ResumeParser().split_sections(content)
+    resume = Resume(filename="a.txt", content=content, user_id=uuid.uuid4())
+    db.add(resume)
+    db.flush()
+    chunks = service._split_sections_into_chunks(sections, content)
+    insert_embedding_rows(db, embedding_rows(resume.id, chunks, ["[1.0]"] * len(chunks)))
+    db.commit()
+    
+    stored = db.scalars(select(ResumeEmbedding).order_by(ResumeEmbedding.chunk_index)).all()
+    texts = service._chunk_texts(db, stored)
+    
+    assert all(chunk.start is not None for chunk in chunks)
+    assert {row.chunk_text for row in stored} == {""}
+    assert [texts[row.id] for row in stored] == [chunk.text for chunk in chunks]
+    assert [section for section, _ in sections] == ["general", "skills", "experience"]
+
+def test_chunks_carry_the_section_they_came_from(db, service):
+    service.chunk_size = 30
+    service.chunk_overlap = 5
+    content = "Jane Doe\nSkills\nPython, SQL, Go\nExperience\n" + "Built pipelines at Acme. " * 3
+    resume_id = str(uuid.uuid4())
+    
+    rows = service._build_embedding_rows(db, [(resume_id, content, None, ResumeParser().split_sections(content))])
+    
+    by_section = {}
+    for row in rows:
+        by_section.setdefault(row["section"], []).append(
+            normalize_whitespace(content)[row["start_offset"]:row["end_offset"]]
+        )
+    assert set(by_section) == {"general", "skills", "experience"}
+    assert by_section["general"] == ["Jane Doe"]
+    assert by_section["skills"] == ["Skills Python, SQL, Go"]
+    assert by_section["experience"][0].startswith("Experience Built")
+    assert not any("Python" in text for text in by_section["experience"])
+
+@pytest.fixture
+def sectioned_resumes(db, service, monkeypatch):
+    monkeypatch.setattr(embedding_service, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    user_id = uuid.uuid4()
+    resumes = [Resume(filename=f"{i}.txt", content="cv", user_id=user_id) for i in range(2)]
+    db.add_all(resumes)
+    db.flush()
+    for resume in resumes:
+        chunks = [Chunk("skills", f"Python {resume.filename}"), Chunk("experience", f"Acme {resume.filename}")]
+        insert_embedding_rows(db, embedding_rows(resume.id, chunks, ["[1.0, 1.0]", "[2.0, 1.0]"]))
+    db.commit()
+    return select(Resume.id).where(Resume.user_id == user_id)
+
+def test_section_filter_restricts_search(service, sectioned_resumes):
+    skills = service.search("python", sectioned_resumes, k=10, sections=["skills"])
+    everything = service.search("python", sectioned_resumes, k=10, sections=[])
+    
+    assert sorted(result["chunk_text"] for result in skills) == ["Python 0.txt", "Python 1.txt"]
+    assert len(everything) == 4
+    assert service.search("python", sectioned_resumes, k=10, sections=["hobbies"]) == []
+
+def test_section_filter_restricts_match_evidence(service, sectioned_resumes):
+    matches = service.match_job_to_resumes("Acme engineer", sectioned_resumes, sections=["experience"])
+    everything = service.match_job_to_resumes("Acme engineer", sectioned_resumes, sections=None)
+    
+    assert len(matches) == 2
+    assert all(evidence.startswith("Acme") for match in matches for evidence in match["evidence"])
+    assert any(evidence.startswith("Python") for match in everything for evidence in match["evidence"])
+    assert service.match_job_to_resumes("Acme engineer", sectioned_resumes, sections=["hobbies"]) == []
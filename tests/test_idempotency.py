@@ -0,0 +1,134 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from auth import create_access_token
+from database import create_db_engine, create_async_db_engine
+from idempotency import IdempotencyStore
+from middleware import IdempotencyMiddleware
+from migrations import migrate
+
+USER_ID = uuid.uuid4()
+
+@pytest.fixture
+def store(tmp_path):
+    url = f"sqlite:///{tmp_path / 'idempotency.db'}"
+    sync_engine = create_db_engine(url)
+    migrate(sync_engine)
+    sync_engine.dispose()
+    
+    async_engine = create_async_db_engine(url)
+    yield IdempotencyStore(async_sessionmaker(async_engine, expire_on_commit=False), wait_seconds=5.0)
+    asyncio.run(async_engine.dispose())
+
+def make_app(store):
+    calls = []
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, store=store)
+    
+    @app.post("/api/jobs")
+    async def create_job(payload: dict):
+        calls.append(payload)
+        await asyncio.sleep(0.05)
+        if payload.get("fail"):
+            raise HTTPException(status_code=400, detail="bad")
+        return {"id": len(calls)}
+    
+    @app.post("/api/resumes")
+    async def upload(file: UploadFile = File(...)):
+        calls.append(file.filename)
+        return {"id": len(calls)}
+    
+    return app, calls
+
+def headers(key, user_id=None):
+    token = create_access_token({"sub": str(user_id or USER_ID), "role": "candidate"})
+    return {"Authorization": f"Bearer {token}", "Idempotency-Key": key}
+
+def run(app, requests):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.post(path, **kwargs) for path, kwargs in requests))
+    return asyncio.run(scenario())
+
+def test_retry_replays_the_stored_response(store):
+    app, calls = make_app(store)
+    
+    first, = run(app, [("/api/jobs", {"json": {"title": "a"}, "headers": headers("k1")})])
+    retry, = run(app, [("/api/jobs", {"json": {"title": "a"}, "headers": headers("k1")})])
+    
+    assert first.json() == retry.json() == {"id": 1}
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+
+def test_concurrent_duplicates_wait_for_the_first_request(store):
+    app, calls = make_app(store)
+    
+    responses = run(app, [("/api/jobs", {"json": {"title": "a"}, "headers": headers("k1")})] * 3)
+    
+    assert [response.json() for response in responses] == [{"id": 1}] * 3
+    assert len(calls) == 1
+
+def test_key_reused_for_a_different_request_is_rejected(store):
+    app, calls = make_app(store)
+    
+    run(app, [("/api/jobs", {"json": {"title": "a"}, "headers": headers("k1")})])
+    other, = run(app, [("/api/jobs", {"json": {"title": "b"}, "headers": headers("k1")})])
+    
+    assert other.status_code == 422
+    assert other.json()["detail"]["error"]["code"] == "IDEMPOTENCY_KEY_REUSED"
+    assert len(calls) == 1
+
+def test_failed_requests_and_other_users_run_again(store):
+    app, calls = make_app(store)
+    
+    failed, retried = [
+        run(app, [("/api/jobs", {"json": {"fail": True}, "headers": headers("k1")})])[0] for _ in range(2)
+    ]
+    other_user, = run(app, [("/api/jobs", {"json": {"fail": True}, "headers": headers("k1", uuid.uuid4())})])
+    
+    assert failed.status_code == retried.status_code == other_user.status_code == 400
+    assert len(calls) == 3
+
+def test_multipart_retries_match_despite_new_boundaries(store):
+    app, calls = make_app(store)
+    
+    responses = [
+        run(app, [("/api/resumes", {"files": {"file": ("cv.txt", b"Python", "text/plain")}, "headers": headers("k1")})])[0]
+        for _ in range(2)
+    ]
+    
+    assert [response.status_code for response in responses] == [200, 200]
+    assert responses[1].headers["idempotent-replayed"] == "true"
+    assert calls == ["cv.txt"]
+
+def test_failing_claim_backs_off_and_reraises(tmp_path):
+    url = f"sqlite:///{tmp_path / 'idempotency.db'}"
+    sync_engine = create_db_engine(url)
+    migrate(sync_engine)
+    sync_engine.dispose()
+    
+    # With foreign keys enforced, claims for a user without a row can never insert
+    async_engine = create_async_db_engine(url)
+    event.listen(async_engine.sync_engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    store = IdempotencyStore(async_sessionmaker(async_engine, expire_on_commit=False), wait_seconds=0.3, poll_interval=0.1)
+    claims = []
+    claim = store._claim
+    async def counting_claim(*args):
+        claims.append(args)
+        return await claim(*args)
+    store._claim = counting_claim
+    
+    with pytest.raises(IntegrityError):
+        asyncio.run(store.acquire(uuid.uuid4(), "k1", "fingerprint"))
+    asyncio.run(async_engine.dispose())
+    
+    assert 2 <= len(claims) <= 5
+
@@ -0,0 +1,78 @@
+import uuid
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from auth import create_access_token
+from middleware import RateLimitMiddleware
+from rate_limiter import RateLimiter
+
+def make_client(rate_limit=3):
+    limiter = RateLimiter()
+    limiter.limits["default"] = rate_limit
+    calls = []
+    
+    app = FastAPI()
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=limiter,
+        operations=[("POST", r"^/api/ask$", "ask")]
+    )
+    
+    @app.get("/api/ping")
+    def ping():
+        calls.append(1)
+        return {"ok": True}
+    
+    @app.post("/api/ask")
+    def ask():
+        calls.append(1)
+        return {"ok": True}
+    
+    @app.get("/health")
+    def health():
+        return {"ok": True}
+    
+    return TestClient(app), limiter, calls
+
+def test_rejects_before_reaching_the_handler():
+    client, _, calls = make_client()
+    
+    statuses = [client.get("/api/ping").status_code for _ in range(4)]
+    
+    assert statuses == [200, 200, 200, 429]
+    assert len(calls) == 3
+
+def test_rejection_body_and_retry_after():
+    client, _, _ = make_client(rate_limit=1)
+    
+    client.get("/api/ping")
+    response = client.get("/api/ping")
+    
+    assert response.status_code == 429
+    assert response.json() == {"detail": {"error": {"code": "RATE_LIMIT", "message": "Rate limit exceeded"}}}
+    assert 1 <= int(response.headers["retry-after"]) <= 60
+
+def test_keys_on_token_subject_then_client_ip():
+    client, limiter, _ = make_client()
+    user_id = uuid.uuid4()
+    token = create_access_token({"sub": str(user_id), "role": "candidate"})
+    
+    client.get("/api/ping", headers={"Authorization": f"Bearer {token}"})
+    client.get("/api/ping", headers={"Authorization": "Bearer not-a-token"})
+    
+    assert str(user_id) in limiter.windows
+    assert "ip:testclient" in limiter.windows
+
+def test_expensive_routes_charge_their_weight():
+    client, limiter, _ = make_client(rate_limit=100)
+    
+    client.post("/api/ask")
+    
+    assert limiter.windows["expensive:ip:testclient"][2] == limiter.costs["ask"]
+
+def test_non_api_paths_are_not_limited():
+    client, _, _ = make_client(rate_limit=1)
+    
+    client.get("/health")
+    assert client.get("/health").status_code == 200
@@ -0,0 +1,153 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import inspect, text
+
+from database import create_db_engine
+import migrations
+from migrations import MIGRATIONS, migrate
+from pii_redactor import PII_PATTERN_VERSION
+
+@pytest.fixture
+def db_engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+def query_plan(conn, sql, **params):
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+def test_fresh_database_applies_every_version_once(db_engine):
+    assert migrate(db_engine) == [version for version, _ in MIGRATIONS]
+    assert migrate(db_engine) == []
+    
+    tables = set(inspect(db_engine).get_table_names())
+    assert {"users", "resumes", "jobs", "resume_embeddings", "resume_fields", "schema_migrations"} <= tables
+
+def test_existing_tables_gain_columns_and_indexes(db_engine):
+    # Schema as created by the original create_all, with a row in it
+    with db_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE resume_embeddings (id CHAR(32) PRIMARY KEY, resume_id CHAR(32) NOT NULL, "
+            "chunk_text TEXT NOT NULL, embedding TEXT NOT NULL, chunk_index INTEGER NOT NULL, created_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO resume_embeddings VALUES ('a', 'b', 'text', '[]', 0, NULL)"
+        ))
+    
+    migrate(db_engine)
+    
+    inspector = inspect(db_engine)
+    assert "section" in {column["name"] for column in inspector.get_columns("resume_embeddings")}
+    assert "ix_resume_embeddings_resume_id" in {index["name"] for index in inspector.get_indexes("resume_embeddings")}
+    with db_engine.connect() as conn:
+        assert conn.execute(text("SELECT section FROM resume_embeddings")).scalar() == "general"
+
+def test_stored_resumes_get_a_redacted_preview(db_engine):
+    with db_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE resumes (id CHAR(32) PRIMARY KEY, filename VARCHAR NOT NULL, content TEXT NOT NULL, "
+            "user_id CHAR(32) NOT NULL, idempotency_key VARCHAR, created_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO resumes (id, filename, content, user_id) "
+            "VALUES (:id, 'cv.txt', 'Contact jane@example.com for details', :user_id)"
+        ), {"id": uuid.uuid4().hex, "user_id": uuid.uuid4().hex})
+    
+    migrate(db_engine)
+    
+    with db_engine.connect() as conn:
+        preview = conn.execute(text("SELECT preview FROM resumes")).scalar()
+    assert preview == "Contact [EMAIL REDACTED] for details"
+
+def test_steps_only_add_their_own_columns(db_engine):
+    with db_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE resumes (id CHAR(32) PRIMARY KEY, filename VARCHAR NOT NULL, content TEXT NOT NULL, "
+            "user_id CHAR(32) NOT NULL, idempotency_key VARCHAR, created_at DATETIME)"
+        ))
+        dict(MIGRATIONS)["0002_ingest_columns"](conn)
+    
+    columns = {column["name"] for column in inspect(db_engine).get_columns("resumes")}
+    assert {"content_hash", "pii_spans", "pii_version"} <= columns
+    assert "preview" not in columns
+
+def test_preview_backfill_runs_in_batches(db_engine, monkeypatch):
+    monkeypatch.setattr(migrations, "BACKFILL_BATCH_SIZE", 2)
+    with db_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE resumes (id CHAR(32) PRIMARY KEY, filename VARCHAR NOT NULL, content TEXT NOT NULL, "
+            "user_id CHAR(32) NOT NULL, idempotency_key VARCHAR, created_at DATETIME)"
+        ))
+        for i in range(5):
+            conn.execute(text(
+                "INSERT INTO resumes (id, filename, content, user_id) VALUES (:id, 'cv.txt', :content, :user_id)"
+            ), {"id": uuid.uuid4().hex, "content": f"Resume {i}", "user_id": uuid.uuid4().hex})
+    
+    migrate(db_engine)
+    
+    with db_engine.connect() as conn:
+        previews = conn.execute(text("SELECT preview FROM resumes ORDER BY preview")).scalars().all()
+    assert previews == [f"Resume {i}" for i in range(5)]
+
+def test_previews_and_spans_from_an_older_pattern_set_are_rebuilt(db_engine):
+    migrate(db_engine)
+    with db_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO resumes (id, filename, content, user_id, preview, pii_spans, pii_version) "
+            "VALUES (:id, 'cv.txt', 'Contact jane@example.com', :user_id, 'Contact jane@example.com', '[]', 'old')"
+        ), {"id": uuid.uuid4().hex, "user_id": uuid.uuid4().hex})
+    
+    with db_engine.connect() as conn:
+        migrations._backfill_resume_previews(conn)
+        preview, spans, version = conn.execute(text("SELECT preview, pii_spans, pii_version FROM resumes")).one()
+    
+    assert preview == "Contact [EMAIL REDACTED]"
+    assert spans == '[[8, 24, "email"]]'
+    assert version == PII_PATTERN_VERSION
+
+@pytest.mark.parametrize("table", ["resumes", "jobs"])
+def test_user_scoped_queries_use_composite_indexes(db_engine, table):
+    migrate(db_engine)
+    user_id = uuid.uuid4().hex
+    
+    with db_engine.connect() as conn:
+        listing = query_plan(
+            conn, f"SELECT id FROM {table} WHERE user_id = :u ORDER BY created_at DESC, id DESC LIMIT 10", u=user_id
+        )
+        idempotency = query_plan(
+            conn, f"SELECT id FROM {table} WHERE user_id = :u AND idempotency_key = :k", u=user_id, k="key"
+        )
+    
+    assert f"ix_{table}_user_id_created_at" in listing
+    assert f"ix_{table}_user_id_idempotency_key" in idempotency
+
+def test_embedding_lookup_uses_resume_index(db_engine):
+    migrate(db_engine)
+    
+    with db_engine.connect() as conn:
+        plan = query_plan(conn, "SELECT chunk_text FROM resume_embeddings WHERE resume_id = :r", r=uuid.uuid4().hex)
+    
+    assert "ix_resume_embeddings_resume_id" in plan
+
+class RecordingConnection:
+    def __init__(self, dialect_name):
+        self.dialect = SimpleNamespace(name=dialect_name)
+        self.statements = []
+    
+    def execute(self, statement):
+        self.statements.append(str(statement))
+
+def test_role_enum_gains_admin_on_postgresql_only():
+    step = dict(MIGRATIONS)["0010_user_role_admin"]
+    
+    postgres = RecordingConnection("postgresql")
+    step(postgres)
+    assert "ALTER TYPE userrole ADD VALUE IF NOT EXISTS 'ADMIN'" in postgres.statements
+    
+    sqlite = RecordingConnection("sqlite")
+    step(sqlite)
+    assert sqlite.statements == []
+
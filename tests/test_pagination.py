@@ -0,0 +1,82 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database import create_db_engine, create_async_db_engine
+from migrations import migrate
+from models import User, Resume
+from pagination import keyset_page, offset_page, count_rows, encode_cursor, decode_cursor, InvalidCursor
+
+@pytest.fixture
+def session_factory(tmp_path):
+    url = f"sqlite:///{tmp_path / 'pages.db'}"
+    sync_engine = create_db_engine(url)
+    migrate(sync_engine)
+    sync_engine.dispose()
+    
+    async_engine = create_async_db_engine(url)
+    yield async_sessionmaker(async_engine, expire_on_commit=False)
+    asyncio.run(async_engine.dispose())
+
+async def seed(factory, count):
+    user = User(email="owner@example.com", hashed_password="x", full_name="Owner")
+    base = datetime(2024, 1, 1)
+    async with factory() as db:
+        db.add(user)
+        # Pairs share a timestamp so the id tie-breaker matters
+        for i in range(count):
+            db.add(Resume(
+                filename=f"{i}.txt", content="text", user=user,
+                created_at=base + timedelta(minutes=i // 2)
+            ))
+        await db.commit()
+    return user.id
+
+def test_cursor_round_trip():
+    created_at, row_id = datetime(2024, 5, 1, 12, 30, 15, 123), uuid.uuid4()
+    
+    assert decode_cursor(encode_cursor(created_at, row_id)) == (created_at, row_id)
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+def test_keyset_pages_cover_every_row_once_newest_first(session_factory):
+    async def scenario():
+        user_id = await seed(session_factory, 25)
+        query = select(Resume).where(Resume.user_id == user_id)
+        
+        seen, cursor = [], None
+        async with session_factory() as db:
+            while True:
+                rows, cursor = await keyset_page(db, query, Resume, 10, cursor)
+                seen.extend(rows)
+                if cursor is None:
+                    break
+            
+            expected = (await db.scalars(
+                query.order_by(Resume.created_at.desc(), Resume.id.desc())
+            )).all()
+            assert await count_rows(db, query) == 25
+        
+        assert [row.id for row in seen] == [row.id for row in expected]
+    
+    asyncio.run(scenario())
+
+def test_offset_page_hands_over_to_cursor(session_factory):
+    async def scenario():
+        user_id = await seed(session_factory, 12)
+        query = select(Resume).where(Resume.user_id == user_id)
+        
+        async with session_factory() as db:
+            first, next_offset, cursor = await offset_page(db, query, Resume, 5, 0)
+            by_offset, _, _ = await offset_page(db, query, Resume, 5, next_offset)
+            by_cursor, _ = await keyset_page(db, query, Resume, 5, cursor)
+            last, next_offset, cursor = await offset_page(db, query, Resume, 5, 10)
+        
+        assert [row.id for row in by_offset] == [row.id for row in by_cursor]
+        assert len(last) == 2 and next_offset is None and cursor is None
+    
+    asyncio.run(scenario())
@@ -0,0 +1,52 @@
+import uuid
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from database import create_db_engine
+from migrations import migrate
+from models import Resume
+from pii_audit import run_audit
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    migrate(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def seed(session_factory, contents):
+    user_id = uuid.uuid4()
+    resumes = [Resume(filename=f"{i}.txt", content=content, user_id=user_id) for i, content in enumerate(contents)]
+    with session_factory() as db:
+        db.add_all(resumes)
+        db.commit()
+        return [str(resume.id) for resume in resumes]
+
+def test_audit_reports_resumes_per_pii_type(session_factory):
+    ssn, card, both, dob, clean = seed(session_factory, [
+        "SSN 123-45-6789",
+        "Card 4111 1111 1111 1111",
+        "SSN 987-65-4321 and card 5500-0000-0000-0004",
+        "Born 04/12/1990",
+        "Python and Go, no identifiers",
+    ])
+    
+    report = run_audit(workers=1, batch_size=2, session_factory=session_factory)
+    
+    assert report['documents'] == 5
+    assert report['counts'] == {'ssn': 2, 'credit_card': 2, 'date_of_birth': 1}
+    assert sorted(report['resume_ids']['ssn']) == sorted([ssn, both])
+    assert sorted(report['resume_ids']['credit_card']) == sorted([card, both])
+    assert report['resume_ids']['date_of_birth'] == [dob]
+
+def test_audit_can_be_restricted_to_some_types(session_factory):
+    seed(session_factory, ["SSN 123-45-6789", "Born 04/12/1990"])
+    
+    report = run_audit(['date_of_birth'], workers=1, session_factory=session_factory)
+    
+    assert report['counts'] == {'date_of_birth': 1}
+
+def test_unknown_pii_type_is_rejected(session_factory):
+    with pytest.raises(ValueError):
+        run_audit(['passport'], workers=1, session_factory=session_factory)
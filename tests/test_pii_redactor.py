@@ -0,0 +1,75 @@
+import pytest
+
+from pii_redactor import PIIRedactor, iter_chunks
+
+SAMPLE = (
+    "Jane Doe, jane.doe@example.com, (555) 123-4567\n"
+    "SSN 123-45-6789, card 4111 1111 1111 1111, born 04/12/1990\n"
+    "Lives at 42 Main Street. Python developer since 2015.\n"
+)
+
+def test_redact_replaces_each_pii_type():
+    redacted = PIIRedactor().redact(SAMPLE)
+    
+    for marker in ("[EMAIL REDACTED]", "[PHONE REDACTED]", "[SSN REDACTED]",
+                   "[CARD REDACTED]", "[DOB REDACTED]", "[ADDRESS REDACTED]"):
+        assert marker in redacted
+    assert "123-45-6789" not in redacted
+    assert "Python developer since 2015." in redacted
+
+def test_detect_pii_returns_full_matches():
+    detected = PIIRedactor().detect_pii(SAMPLE)
+    
+    assert detected['email'] == ["jane.doe@example.com"]
+    assert detected['ssn'] == ["123-45-6789"]
+    assert detected['credit_card'] == ["4111 1111 1111 1111"]
+    assert detected['phone'] == ["555) 123-4567"]
+
+@pytest.mark.parametrize("address", [
+    "42 Main Street",
+    "42 Old Mill, Springfield Road",
+    "7 The Old Bakery, 12 High St",
+    "1600 Pennsylvania Ave",
+    "42 Old Mill,\nSpringfield Road",
+    "3 Flat B, Rose Court, Kings Lane",
+])
+def test_redact_covers_multi_part_addresses(address):
+    redacted = PIIRedactor().redact(f"Lives at {address}. Python developer.")
+    
+    assert redacted == "Lives at [ADDRESS REDACTED]. Python developer."
+
+def test_text_without_pii_is_returned_unchanged():
+    redactor = PIIRedactor()
+    text = "Led a team of five engineers"
+    
+    assert redactor.redact(text) is text
+    assert not redactor.is_pii_present(text)
+    assert redactor.is_pii_present(SAMPLE)
+
+def test_stored_spans_reproduce_redaction():
+    redactor = PIIRedactor()
+    spans = redactor.find_spans(SAMPLE)
+    
+    assert all(isinstance(span[2], str) for span in spans)
+    assert redactor.apply_spans(SAMPLE, spans) == redactor.redact(SAMPLE)
+    assert redactor.apply_spans("no pii here", []) == "no pii here"
+
+def test_streaming_redaction_matches_across_chunk_boundaries():
+    redactor = PIIRedactor()
+    text = ("filler text " * 50 + SAMPLE) * 20
+    
+    for chunk_size in (1, 13, 256):
+        streamed = list(redactor.redact_stream(iter_chunks(text, chunk_size), overlap=64))
+        assert ''.join(streamed) == redactor.redact(text)
+    assert len(streamed) > 1
+
+def test_stored_spans_stream_in_bounded_pieces():
+    redactor = PIIRedactor()
+    text = ("filler text " * 50 + SAMPLE) * 20
+    spans = redactor.find_spans(text)
+    
+    for chunk_size in (7, 256, 64 * 1024):
+        streamed = list(redactor.stream_spans(text, spans, chunk_size))
+        assert ''.join(streamed) == redactor.redact(text)
+        assert all(len(piece) < 2 * chunk_size + 32 for piece in streamed)
+    assert list(redactor.stream_spans("", [])) == []
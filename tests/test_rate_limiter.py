@@ -0,0 +1,127 @@
+import threading
+import pytest
+from rate_limiter import RateLimiter
+
+BASE_TIME = 60 * 16667 + 20.0  # 20 seconds into a fixed window
+
+def make_limiter():
+    limiter = RateLimiter()
+    assert not limiter.use_redis
+    return limiter
+
+def test_memory_limit_allows_up_to_rate_limit():
+    limiter = make_limiter()
+    now = BASE_TIME
+    
+    results = [limiter._check_memory_rate_limit("user", now) for _ in range(61)]
+    
+    assert results[:60] == [True] * 60
+    assert results[60] is False
+
+def test_memory_limit_slides_previous_window_weight():
+    limiter = make_limiter()
+    start = BASE_TIME
+    for _ in range(60):
+        limiter._check_memory_rate_limit("user", start)
+    
+    # Half way through the next window half of the previous count still applies
+    halfway = start - 20 + 60 + 30
+    allowed = sum(limiter._check_memory_rate_limit("user", halfway) for _ in range(60))
+    assert allowed == 30
+    
+    # Two windows later nothing carries over
+    assert limiter._check_memory_rate_limit("user", start + 150)
+
+def test_idle_keys_are_evicted():
+    limiter = make_limiter()
+    now = BASE_TIME
+    for i in range(100):
+        limiter._check_memory_rate_limit(f"user-{i}", now)
+    
+    limiter._check_memory_rate_limit("active", now + 3 * limiter.window_size)
+    
+    assert list(limiter.windows) == ["active"]
+
+def test_memory_limit_is_thread_safe():
+    limiter = make_limiter()
+    now = BASE_TIME
+    results = []
+    
+    def worker():
+        for _ in range(50):
+            results.append(limiter._check_memory_rate_limit("shared", now))
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert results.count(True) == limiter.rate_limit
+
+def test_redis_script_enforces_limit_atomically():
+    fakeredis = pytest.importorskip("fakeredis")
+    limiter = RateLimiter(redis_client=fakeredis.FakeRedis())
+    
+    results = [limiter._check_redis_rate_limit("user", BASE_TIME) for _ in range(61)]
+    
+    assert results.count(True) == 60
+    assert results[60] is False
+    assert limiter._check_redis_rate_limit("other", BASE_TIME)
+
+def test_redis_failure_falls_back_to_local_limiting():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    limiter = RateLimiter(redis_client=fakeredis.FakeRedis(server=server))
+    server.connected = False
+    
+    assert limiter.is_allowed("user")
+    assert limiter.windows["user"][2] == 1
+    assert limiter.redis_retry_after > 0
+
+def test_hybrid_workers_share_a_global_budget(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from config import settings
+    monkeypatch.setattr(settings, "rate_limit_mode", "hybrid")
+    server = fakeredis.FakeServer()
+    workers = [RateLimiter(redis_client=fakeredis.FakeRedis(server=server)) for _ in range(2)]
+    for worker in workers:
+        worker._ensure_reconciler = lambda: None
+    
+    admitted = 0
+    for step in range(20):
+        now = BASE_TIME + step * 0.1
+        for worker in workers:
+            admitted += sum(worker._check_hybrid_rate_limit("user", now) for _ in range(5))
+            worker.reconcile(now)
+    
+    # Approximately the global limit: at most one extra lease per worker
+    assert 60 <= admitted <= 60 + 2 * workers[0].lease_size
+    assert not workers[0]._check_hybrid_rate_limit("user", BASE_TIME + 2)
+
+def test_expensive_operations_use_weighted_bucket():
+    limiter = make_limiter()
+    limiter.costs = {"match": 10}
+    limiter.limits["expensive"] = 30
+    
+    results = [limiter.allow_operation("user", "match") for _ in range(4)]
+    
+    assert results == [True, True, True, False]
+    # Cheap requests still have budget left in the default bucket
+    assert limiter.allow_operation("user")
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_rejected_expensive_operation_does_not_charge_default_bucket(backend):
+    if backend == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        limiter = RateLimiter(redis_client=fakeredis.FakeRedis())
+    else:
+        limiter = make_limiter()
+    limiter.costs = {"match": 10}
+    limiter.limits.update({"default": 3, "expensive": 10})
+    
+    assert limiter.allow_operation("user", "match")
+    assert [limiter.allow_operation("user", "match") for _ in range(5)] == [False] * 5
+    
+    # Only the admitted match used default budget
+    assert [limiter.allow_operation("user") for _ in range(3)] == [True, True, False]
@@ -0,0 +1,273 @@
+import io
+import time
+import pytest
+import PyPDF2
+from config import settings
+from parse_cache import ParseCache, content_hash
+import resume_parser
+from resume_parser import ResumeParser, ResumeParseError, canonical_degree, canonical_skill, canonical_title
+
+SAMPLE_RESUME = b"""Jane Smith
+Summary
+Backend engineer focused on APIs
+Experience
+Acme Corp - Senior Engineer
+Skills
+Python, FastAPI, PostgreSQL
+"""
+
+def test_parse_document_extracts_text_and_sections():
+    parser = ResumeParser(cache=ParseCache())
+    document = parser.parse_document(SAMPLE_RESUME, "resume.txt")
+    
+    assert document['content_hash'] == content_hash(SAMPLE_RESUME)
+    assert document['text_hash'] == content_hash(document['text'].encode('utf-8'))
+    assert "Acme Corp" in document['text']
+    sections = dict(document['sections'])
+    assert sections['general'] == "Jane Smith"
+    assert "Python, FastAPI" in sections['skills']
+
+def test_identical_bytes_skip_parsing():
+    parser = ResumeParser(cache=ParseCache())
+    first = parser.parse_document(SAMPLE_RESUME, "a.txt")
+    
+    calls = []
+    parser._parse_content = lambda content, filename: calls.append(filename)
+    second = parser.parse_document(SAMPLE_RESUME, "b.txt")
+    
+    assert calls == []
+    assert second is first
+    assert parser.cache.hits == 1
+
+def test_cache_evicts_least_recently_used_entries():
+    cache = ParseCache(max_entries=2, max_bytes=1024)
+    cache.put("a", {'text': "a" * 10})
+    cache.put("b", {'text': "b" * 10})
+    cache.get("a")
+    cache.put("c", {'text': "c" * 10})
+    
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert len(cache) == 2
+
+def test_cache_respects_byte_budget():
+    cache = ParseCache(max_entries=100, max_bytes=25)
+    cache.put("a", {'text': "a" * 10})
+    cache.put("b", {'text': "b" * 10})
+    cache.put("c", {'text': "c" * 10})
+    
+    assert cache.total_bytes <= 25
+    assert cache.get("a") is None
+
+def _blank_pdf(pages: int) -> bytes:
+    writer = PyPDF2.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+def _text_pdf(texts):
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+    
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+def test_large_pdf_pages_are_extracted_in_parallel_and_in_order(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_parallel_min_pages", 2)
+    monkeypatch.setattr(settings, "pdf_parse_workers", 2)
+    parser = ResumeParser(cache=ParseCache())
+    inline = []
+    monkeypatch.setattr(parser, "_extract_pages_inline", lambda *args: inline.append(args))
+    
+    text = parser.parse(_text_pdf([f"Page {i}" for i in range(5)]), "resume.pdf")
+    
+    assert text.split("\n") == [f"Page {i}" for i in range(5)]
+    assert inline == []
+
+def test_pdf_page_cap_applies_before_extraction(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_max_pages", 3)
+    parser = ResumeParser(cache=ParseCache())
+    assert parser.parse(_text_pdf(["a", "b", "c"]), "three.pdf") == "a\nb\nc"
+    
+    calls = []
+    monkeypatch.setattr(parser, "_extract_pages_inline", lambda *args: calls.append(args))
+    with pytest.raises(ResumeParseError) as exc_info:
+        parser.parse(_text_pdf(["a", "b", "c", "d"]), "four.pdf")
+    
+    assert exc_info.value.code == "PDF_TOO_MANY_PAGES"
+    assert calls == []
+
+def test_parallel_timeout_raises_and_replaces_the_pool(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_parallel_min_pages", 2)
+    monkeypatch.setattr(settings, "pdf_parse_workers", 2)
+    monkeypatch.setattr(settings, "pdf_parse_timeout_seconds", 0.0)
+    parser = ResumeParser(cache=ParseCache())
+    content = _text_pdf([f"Page {i}" for i in range(40)])
+    # A cold pool cannot answer before the already expired deadline
+    resume_parser._retire_pdf_pool(resume_parser._get_pdf_pool(), [])
+    stuck = resume_parser._get_pdf_pool()
+    
+    with pytest.raises(ResumeParseError) as exc_info:
+        parser.parse(content, "slow.pdf")
+    
+    assert exc_info.value.code == "PDF_TIMEOUT"
+    assert resume_parser._pdf_pool is None
+    monkeypatch.setattr(settings, "pdf_parse_timeout_seconds", 20.0)
+    assert parser.parse(content, "retry.pdf").startswith("Page 0")
+    assert resume_parser._get_pdf_pool() is not stuck
+
+def test_timeout_leaves_other_in_flight_extractions_running(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_parse_workers", 2)
+    parser = ResumeParser(cache=ParseCache())
+    content = _text_pdf([f"Page {i}" for i in range(40)])
+    resume_parser._retire_pdf_pool(resume_parser._get_pdf_pool(), [])
+    pool = resume_parser._get_pdf_pool()
+    # Another request's extraction, submitted before this one times out
+    in_flight = pool.submit(resume_parser._extract_page_range, content, 0, 40)
+    
+    with pytest.raises(ResumeParseError) as exc_info:
+        parser._extract_pages_parallel(content, 40, deadline=time.monotonic())
+    
+    assert exc_info.value.code == "PDF_TIMEOUT"
+    assert in_flight.result(timeout=20) == [f"Page {i}" for i in range(40)]
+    assert resume_parser._get_pdf_pool() is not pool
+
+def test_corrupt_pdf_raises_structured_error():
+    parser = ResumeParser(cache=ParseCache())
+    with pytest.raises(ResumeParseError) as exc_info:
+        parser.parse(b"not a pdf", "resume.pdf")
+    assert exc_info.value.code == "PDF_PARSE_ERROR"
+
+def test_pdf_page_limit_is_enforced(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_max_pages", 2)
+    parser = ResumeParser(cache=ParseCache())
+    with pytest.raises(ResumeParseError) as exc_info:
+        parser.parse(_blank_pdf(3), "resume.pdf")
+    assert exc_info.value.code == "PDF_TOO_MANY_PAGES"
+
+def test_pdf_without_text_is_not_cached():
+    parser = ResumeParser(cache=ParseCache())
+    with pytest.raises(ResumeParseError) as exc_info:
+        parser.parse(_blank_pdf(1), "resume.pdf")
+    assert exc_info.value.code == "PDF_NO_TEXT"
+    assert len(parser.cache) == 0
+
+def test_section_headers_must_start_the_line():
+    parser = ResumeParser(cache=ParseCache())
+    content = (
+        "Experience\n"
+        "Built services; gained experience with Kafka and education tooling\n"
+        "Skills: Python, Go, Rust, Kubernetes, Terraform and AWS\n"
+    )
+    blocks = parser.split_sections(content)
+    
+    assert [name for name, _ in blocks] == ['experience', 'skills']
+    assert "Kafka" in blocks[0][1]
+
+@pytest.mark.parametrize("header, section", [
+    ("Experience", "experience"),
+    ("Work Experience", "experience"),
+    ("PROFESSIONAL EXPERIENCE:", "experience"),
+    ("Relevant Experience", "experience"),
+    ("Work History", "experience"),
+    ("Employment History", "experience"),
+    ("Education", "education"),
+    ("Academic", "education"),
+    ("Professional Summary", "summary"),
+    ("About Me", "summary"),
+    ("Key Skills", "skills"),
+    ("Technical Skills", "skills"),
+    ("Core Competencies", "skills"),
+    ("Skills: Python, Go", "skills"),
+    ("Personal Projects", "projects"),
+    ("Academic Projects", "projects"),
+    ("Certifications", "certifications"),
+])
+def test_common_section_header_variants(header, section):
+    parser = ResumeParser(cache=ParseCache())
+    blocks = parser.split_sections(f"Jane Smith\n{header}\nbody text\n")
+    
+    assert [name for name, _ in blocks] == ['general', section]
+
+@pytest.mark.parametrize("line", [
+    "Experience in building APIs at scale",
+    "Education technology startup, 2019",
+    "Skills gained include mentoring",
+    "Work experience with Kafka and Go",
+])
+def test_body_lines_starting_with_a_keyword_are_not_headers(line):
+    parser = ResumeParser(cache=ParseCache())
+    blocks = parser.split_sections(f"Skills\nPython\n{line}\n")
+    
+    assert [name for name, _ in blocks] == ['skills']
+    assert line in blocks[0][1]
+
+def test_extract_fields_for_prefiltering():
+    parser = ResumeParser(cache=ParseCache())
+    content = (
+        "Senior Software Engineer with 6+ years of Python and Golang on AWS\n"
+        "Experience\n"
+        "Acme - Backend Engineer 2012 - 2016\n"
+        "Initech - Data Engineer 2015 - 2020\n"
+        "Education\n"
+        "B.S. Computer Science\n"
+    )
+    fields = parser.extract_fields(content)
+    
+    assert fields['skills'] == ['aws', 'go', 'python']
+    assert 'software engineer' in fields['titles']
+    assert fields['degrees'] == ['bachelor']
+    assert fields['years_experience'] == 8.0
+
+@pytest.mark.parametrize("canonicalize, value, expected", [
+    (canonical_skill, "Golang", "go"),
+    (canonical_skill, " js ", "javascript"),
+    (canonical_skill, "node", "node.js"),
+    (canonical_skill, "Python", "python"),
+    (canonical_title, "Full-Stack Engineer", "full stack engineer"),
+    (canonical_title, "Senior Data  Scientist", "data scientist"),
+    (canonical_degree, "M.Sc", "master"),
+    (canonical_degree, "Bachelor's", "bachelor"),
+    (canonical_degree, "PhD", "phd"),
+    (canonical_degree, "master", "master"),
+])
+def test_filter_values_are_canonicalized_like_stored_fields(canonicalize, value, expected):
+    assert canonicalize(value) == expected
+
+@pytest.mark.parametrize("content, degrees", [
+    ("Cut p99 latency to 200 ms", []),
+    ("Expert in MS Excel and MS Word", []),
+    ("M.S. Computer Science", ['master']),
+    ("MSc Data Science, BSc Physics", ['bachelor', 'master']),
+    ("Master's in Statistics", ['master']),
+    ("B.A. Economics", ['bachelor']),
+])
+def test_degree_abbreviations_need_degree_forms(content, degrees):
+    parser = ResumeParser(cache=ParseCache())
+    assert parser.extract_fields(content)['degrees'] == degrees
+
+def test_age_is_not_years_of_experience():
+    parser = ResumeParser(cache=ParseCache())
+    
+    assert parser.extract_fields("Jane, 25 years old, backend developer")['years_experience'] is None
+    assert parser.extract_fields("25 years old with 4 years of Go experience")['years_experience'] == 4.0
+